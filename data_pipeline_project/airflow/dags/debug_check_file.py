@@ -31,5 +31,6 @@ def check_file_exists():
     else:
         print("✅ File found.")
 
-# Run this for testing
-check_file_exists()
+# Run this for testing: `python debug_check_file.py` (never on import, the scheduler parses this folder)
+if __name__ == "__main__":
+    check_file_exists()
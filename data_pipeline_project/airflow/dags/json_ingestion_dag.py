@@ -1,57 +1,100 @@
 from airflow import DAG
 from airflow.operators.python import PythonOperator
+from airflow.exceptions import AirflowSkipException
 from datetime import datetime, timedelta
 import sys
 import os
-from configparser import ConfigParser
-from loguru import logger # Assuming loguru is installed and available in Airflow's env
-
-# Import subprocess for the debug task (Crucial for environment debugging)
-import subprocess
 
 # ✅ Add root project path for custom modules
 sys.path.append("/home/aman_kumar/wns_projects/data_pipeline_project")
 
-# ✅ Project imports
-from src.main.s3.upload_to_s3 import upload_file
-from src.main.db.load_json_to_rds import load_json_to_rds
-from src.main.db.rds_connector import PostgresConnection as DBConnection
-from src.main.db.rds_table_manager import RDSTableManager
-
-# ✅ Config loader
-def get_config():
-    config_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../../resources/config.ini'))
-    print(f"🔍 Using config file: {config_path}")
-    config = ConfigParser()
-    files_read = config.read(config_path)
-    if not files_read:
-        raise FileNotFoundError(f"❌ Config file not found at: {config_path}")
-    return config
+# ✅ The scheduler re-parses this file continuously: module level holds only the DAG shape.
+# Project modules (boto3, pandas, SQLAlchemy, pyarrow), loguru and subprocess are imported
+# inside the callables, and nothing here touches files, the network or the config.
+
+# ✅ Load source: "s3" loads after the upload, "local" loads the local copy
+# while the upload archives it to S3 in parallel
+LOAD_SOURCE = os.environ.get("JSON_INGESTION_LOAD_SOURCE", "s3")
+
+# ✅ Sharded mode: one mapped load task per department, then a merge/verify task
+SHARDED_LOAD = os.environ.get("JSON_INGESTION_SHARDED", "0") == "1"
+
+# ✅ pip freeze on every run is opt-in; it no longer sits on the critical path
+DEBUG_ENV = os.environ.get("JSON_INGESTION_DEBUG_ENV", "0") == "1"
+
+# ✅ Config loader: parsed, overridden (PIPELINE__* env vars, [airflow] connections) and validated once per process
+def get_settings():
+    from src.main.utils.settings import get_settings as load_settings
+
+    return load_settings(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../resources/config.ini')))
 
 # ✅ Path resolution
 def get_paths():
-    config = get_config()
-    json_path = os.path.abspath(config["local"]["json_file_path"])
+    settings = get_settings()
+    json_path = settings.json_file_path
     json_filename = os.path.basename(json_path)
-    return config, json_filename, json_path
+    return settings.config, json_filename, json_path
+
+# ✅ Task 1: Check if file exists (and whether its content was already loaded)
+def check_file_exists(ti):
+    from loguru import logger
+    from src.main.utils.manifest import get_manifest
 
-# ✅ Task 1: Check if file exists
-def check_file_exists():
-    _, _, json_path = get_paths()
+    config, _, json_path = get_paths()
     print(f"🔍 Looking for JSON file: {json_path}")
     if not os.path.exists(json_path):
         raise FileNotFoundError(f"❌ No JSON file found at: {json_path}")
     logger.info("✅ JSON file found.")
 
+    manifest = get_manifest(config)
+    if manifest is not None:
+        fingerprint = manifest.fingerprint(json_path)
+        ti.xcom_push(key="fingerprint", value=fingerprint)
+        content_hash = fingerprint["content_hash"]
+    elif get_settings().load.checkpoint:
+        from src.main.s3.transfer import path_sha256
+        content_hash = path_sha256(json_path)
+    else:
+        return
+
+    # ✅ Checkpoint load id: stable across runs, unlike the timestamped S3 key
+    ti.xcom_push(key="content_hash", value=content_hash)
+    if manifest is not None and manifest.is_loaded(content_hash):
+        # Skipping here skips every downstream task too
+        raise AirflowSkipException(f"⏭️ Content {content_hash[:12]} already loaded. Nothing to do.")
+
 # ✅ Task 2: Upload to S3 and return key
 def upload_to_s3_callable(ti):
+    from loguru import logger
+    from src.main.s3.upload_to_s3 import get_uploader, upload_file
+    from src.main.utils.manifest import get_manifest
+    from src.main.utils.metrics import export_metrics, reset_stages
+
     config, json_filename, _ = get_paths()
+    reset_stages()
+    manifest = get_manifest(config)
+    fingerprint = ti.xcom_pull(task_ids="check_file_exists", key="fingerprint") if manifest else None
+
+    # ♻️ Same content already in S3: reuse that object instead of uploading again
+    if fingerprint:
+        known_key = manifest.s3_key_for(fingerprint["content_hash"])
+        if known_key and get_uploader(config).object_exists(known_key):
+            logger.info(f"♻️ Content already in S3 at key: {known_key}")
+            ti.xcom_push(key="s3_key", value=known_key)
+            return
+
     s3_key = upload_file(config) # This now returns the full S3 key
     logger.info(f"🚀 Uploaded to S3 with key: {s3_key}")
+    if fingerprint:
+        manifest.record_upload(fingerprint, s3_key)
     ti.xcom_push(key="s3_key", value=s3_key) # Send key to next task
+    export_metrics(config, ti, job=ti.task_id)
 
 # ✅ NEW DEBUG TASK:
 def debug_python_environment():
+    import subprocess
+    from loguru import logger
+
     logger.info(f"DEBUG: Python executable: {sys.executable}")
     logger.info(f"DEBUG: Python version: {sys.version}")
 
@@ -66,27 +109,173 @@ def debug_python_environment():
         logger.error("DEBUG: 'pip' command not found. Ensure pip is installed and in PATH for this Python environment.")
 
 
-# ✅ Task 3: Load JSON from S3 to RDS
+# ✅ Task 3: Load JSON from S3 (or the local copy) to RDS
 def load_json_to_rds_callable(ti):
+    from loguru import logger
+    from src.main.db.change_store import get_change_capture
+    from src.main.db.checkpoint import checkpoint_for, get_checkpoints
+    from src.main.db.load_json_to_rds import load_local_json_to_rds, load_s3_object
+    from src.main.db.rds_connector import PostgresConnection as DBConnection
+    from src.main.db.rds_table_manager import RDSTableManager
+    from src.main.utils.manifest import get_manifest
+    from src.main.utils.metrics import export_metrics, reset_stages
+
+    config, _, json_path = get_paths()
+    reset_stages()
+    if LOAD_SOURCE == "local":
+        s3_key = None
+        logger.info(f"📥 Loading JSON from local file: {json_path}")
+    else:
+        s3_key = ti.xcom_pull(task_ids="upload_to_s3", key="s3_key")
+        if not s3_key:
+            raise ValueError("❌ S3 key not found in XCom.")
+        logger.info(f"📥 Loading JSON from S3 key: {s3_key}")
+
+    db_connection = DBConnection(config)
+    db_connection.connect()
+
+    try:
+        table_manager = RDSTableManager(db_connection)
+        write_mode = get_settings().load.write_mode
+
+        # ✅ A retry (or rerun) of the same content resumes after its last committed batch
+        checkpoints = get_checkpoints(config)
+        load_id = ti.xcom_pull(task_ids="check_file_exists", key="content_hash")
+        resume = checkpoints is not None and checkpoints.resume([load_id], table_manager.load_targets(write_mode))
+        checkpoint = checkpoint_for(checkpoints, load_id)
+
+        target_table = table_manager.prepare_load(write_mode, resume=resume)
+        capture = get_change_capture(config)
+        if s3_key is None:
+            load_local_json_to_rds(config, db_connection, json_path, table=target_table, checkpoint=checkpoint, capture=capture)
+        else:
+            load_s3_object(config, db_connection, s3_key, table=target_table, checkpoint=checkpoint, capture=capture)
+        table_manager.finish_load(write_mode, checkpoints=checkpoints)
+        # ✅ Published only once the merge or swap succeeded; a failed one re-emits the same delta on retry
+        if capture is not None:
+            capture.finish()
+
+        manifest = get_manifest(config)
+        fingerprint = ti.xcom_pull(task_ids="check_file_exists", key="fingerprint") if manifest else None
+        if fingerprint:
+            manifest.mark_loaded(fingerprint)
+
+        export_metrics(config, ti, job=ti.task_id)
+
+    finally:
+        db_connection.close()
+
+# ✅ Sharded load 1/3: table DDL + Parquet stage, returns one shard per department
+def prepare_shards_callable(ti):
+    from loguru import logger
+    from src.main.db.checkpoint import get_checkpoints
+    from src.main.db.load_json_to_rds import build_stage
+    from src.main.db.rds_connector import PostgresConnection as DBConnection
+    from src.main.db.rds_table_manager import RDSTableManager
+    from src.main.utils.metrics import export_metrics, reset_stages
+    from src.main.utils.parquet_stage import stage_partition_values
+
     config, _, _ = get_paths()
+    reset_stages()
     s3_key = ti.xcom_pull(task_ids="upload_to_s3", key="s3_key")
     if not s3_key:
         raise ValueError("❌ S3 key not found in XCom.")
 
-    logger.info(f"📥 Loading JSON from S3 key: {s3_key}")
-
     db_connection = DBConnection(config)
     db_connection.connect()
-
     try:
+        write_mode = get_settings().load.write_mode
         table_manager = RDSTableManager(db_connection)
-        table_manager.create_employee_table()
+        checkpoints = get_checkpoints(config)
+        load_id = ti.xcom_pull(task_ids="check_file_exists", key="content_hash")
+        resume = checkpoints is not None and checkpoints.resume([load_id], table_manager.load_targets(write_mode))
+        target_table = table_manager.prepare_load(write_mode, resume=resume)
+    finally:
+        db_connection.close()
+
+    stage_uri = build_stage(config, s3_key)
+    if not stage_uri.startswith("s3://"):
+        logger.warning(
+            f"⚠️ Local Parquet stage {stage_uri}: load_shard tasks on other workers cannot read it. "
+            "Use an s3:// [staging] uri unless every task runs on this host."
+        )
+    departments = stage_partition_values(config, stage_uri, "department")
+    logger.info(f"🧩 {len(departments)} shard(s): {departments}")
 
-        load_json_to_rds(config, db_connection, s3_key)
+    ti.xcom_push(key="stage_uri", value=stage_uri)
+    ti.xcom_push(key="target_table", value=target_table)
+    export_metrics(config, ti, job=ti.task_id)
+    return [{"department": department} for department in departments]
 
+# ✅ Sharded load 2/3: runs once per department, possibly on different workers
+def load_shard_callable(department, ti):
+    from src.main.db.checkpoint import checkpoint_for, get_checkpoints
+    from src.main.db.load_json_to_rds import load_stage_to_rds
+    from src.main.db.rds_connector import PostgresConnection as DBConnection
+    from src.main.utils.metrics import export_metrics, reset_stages
+
+    config, _, _ = get_paths()
+    reset_stages()
+    stage_uri = ti.xcom_pull(task_ids="prepare_shards", key="stage_uri")
+    target_table = ti.xcom_pull(task_ids="prepare_shards", key="target_table")
+
+    db_connection = DBConnection(config)
+    db_connection.connect()
+    try:
+        # ✅ One checkpoint per shard: a retried shard skips its committed row groups
+        load_id = ti.xcom_pull(task_ids="check_file_exists", key="content_hash")
+        checkpoint = checkpoint_for(get_checkpoints(config), f"{load_id}#department={department}")
+        rows = load_stage_to_rds(
+            config, db_connection, stage_uri, table=target_table, filters={"department": department}, checkpoint=checkpoint
+        )
     finally:
         db_connection.close()
 
+    export_metrics(config, ti, job=ti.task_id)
+    return rows
+
+# ✅ Sharded load 3/3: merge (upsert mode) and check every staged row arrived
+def merge_and_verify_callable(ti):
+    from loguru import logger
+    from src.main.db.checkpoint import get_checkpoints
+    from src.main.db.load_json_to_rds import capture_stage_changes
+    from src.main.db.rds_connector import PostgresConnection as DBConnection
+    from src.main.db.rds_table_manager import RDSTableManager
+    from src.main.utils.manifest import get_manifest
+    from src.main.utils.parquet_stage import stage_row_count
+
+    config, _, _ = get_paths()
+    stage_uri = ti.xcom_pull(task_ids="prepare_shards", key="stage_uri")
+    shard_rows = sum(ti.xcom_pull(task_ids="load_shard") or [])
+    staged_rows = stage_row_count(config, stage_uri)
+    if shard_rows != staged_rows:
+        raise ValueError(f"❌ Shards loaded {shard_rows} rows but the stage holds {staged_rows}.")
+    logger.success(f"✅ All {staged_rows} staged rows loaded across shards.")
+
+    db_connection = DBConnection(config)
+    db_connection.connect()
+    try:
+        write_mode = get_settings().load.write_mode
+        RDSTableManager(db_connection).finish_load(write_mode, checkpoints=get_checkpoints(config))
+    finally:
+        db_connection.close()
+
+    # ✅ One diff over the whole stage once every shard is in ([cdc] enabled)
+    capture_stage_changes(config, stage_uri, s3_key=ti.xcom_pull(task_ids="upload_to_s3", key="s3_key"))
+
+    manifest = get_manifest(config)
+    fingerprint = ti.xcom_pull(task_ids="check_file_exists", key="fingerprint") if manifest else None
+    if fingerprint:
+        manifest.mark_loaded(fingerprint)
+
+# ✅ Batch mode: every pending file in the landing directory / S3 prefix
+def batch_ingest_callable():
+    from src.main.batch_ingest import run_batch
+
+    config, _, _ = get_paths()
+    statuses = run_batch(config)
+    return statuses # Per-file status lands in XCom
+
 # ✅ DAG configuration
 default_args = {
     'owner': 'airflow',
@@ -115,17 +304,57 @@ with dag:
         python_callable=upload_to_s3_callable
     )
 
-    # NEW: Add the debug task into the DAG sequence
-    t_debug_env = PythonOperator(
-        task_id='debug_python_environment',
-        python_callable=debug_python_environment,
-        dag=dag,
-    )
+    if SHARDED_LOAD:
+        t_prepare = PythonOperator(
+            task_id='prepare_shards',
+            python_callable=prepare_shards_callable
+        )
 
-    t3_load = PythonOperator(
-        task_id='load_json_to_rds',
-        python_callable=load_json_to_rds_callable
-    )
+        # Dynamic task mapping: one load task per department returned by prepare_shards
+        t_load_shards = PythonOperator.partial(
+            task_id='load_shard',
+            python_callable=load_shard_callable
+        ).expand(op_kwargs=t_prepare.output)
+
+        t_verify = PythonOperator(
+            task_id='merge_and_verify',
+            python_callable=merge_and_verify_callable
+        )
+
+        t1_check >> t2_upload >> t_prepare >> t_load_shards >> t_verify
+    else:
+        t3_load = PythonOperator(
+            task_id='load_json_to_rds',
+            python_callable=load_json_to_rds_callable
+        )
 
-    # ✅ Task sequence - updated to include the debug task
-    t1_check >> t2_upload >> t_debug_env >> t3_load
\ No newline at end of file
+        # ✅ Task sequence
+        if LOAD_SOURCE == "local":
+            # Upload (archive) and load run side by side
+            t1_check >> t2_upload
+            t1_check >> t3_load
+        else:
+            t1_check >> t2_upload >> t3_load
+
+    # Opt-in debug task, off the critical path
+    if DEBUG_ENV:
+        t_debug_env = PythonOperator(
+            task_id='debug_python_environment',
+            python_callable=debug_python_environment,
+        )
+        t1_check >> t_debug_env
+
+# ✅ Batch DAG: parallel ingestion of all pending files
+batch_dag = DAG(
+    dag_id='json_batch_ingestion_pipeline',
+    default_args=default_args,
+    schedule_interval='@daily',
+    catchup=False,
+    description='Ingests every pending JSON file with a parallel worker pool and archives it.',
+)
+
+with batch_dag:
+    t_batch = PythonOperator(
+        task_id='batch_ingest',
+        python_callable=batch_ingest_callable
+    )
@@ -0,0 +1,75 @@
+import argparse
+import os
+import tempfile
+import time
+
+import boto3
+from loguru import logger
+from moto import mock_aws
+
+from src.benchmarks.synthetic_data import MB, write_company_of_size
+from src.main.s3.transfer import ChecksumReader, DecompressingReader, content_encoding, expected_object_checksum, zstandard
+from src.main.s3.upload_to_s3 import S3Uploader
+from src.main.utils.stream_json import iter_employee_rows
+
+BUCKET = "bench-bucket"
+
+# (compression, level); None = raw baseline
+SETTINGS = [(None, None), ("gzip", 1), ("gzip", 6), ("zstd", 1), ("zstd", 3), ("zstd", 9)]
+
+def read_rows(s3, key):
+    # ✅ Same path as the loader: streaming GET, checksum on the wire bytes, on-the-fly decode
+    obj = s3.get_object(Bucket=BUCKET, Key=key)
+    body = ChecksumReader(obj["Body"], key, expected_object_checksum(obj), obj["ContentLength"])
+    encoding = content_encoding(obj, key)
+    reader = DecompressingReader(body, encoding, key) if encoding else body
+    rows = sum(1 for _ in iter_employee_rows(reader))
+    reader.verify()
+    return rows
+
+@mock_aws
+def run(size_mb, bandwidth_mbps):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket=BUCKET)
+    uploader = S3Uploader(None, None, "us-east-1", BUCKET)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "company.json")
+        write_company_of_size(path, size_mb)
+        size = os.path.getsize(path)
+
+        # moto has no network, so wire time is modelled from --bandwidth-mbps (megabits/s)
+        print(f"{size / MB:.1f} MB document, wire time at {bandwidth_mbps} Mbit/s")
+        print(f"{'codec':>6} {'level':>5} {'stored MB':>10} {'ratio':>6} {'compress s':>10} {'read+parse s':>12} {'wire s':>8} {'saved s':>8}")
+        raw_wire_s = size * 8 / (bandwidth_mbps * 1e6)
+        for compression, level in SETTINGS:
+            if compression == "zstd" and zstandard is None:
+                continue
+            key = f"bench/{compression or 'raw'}_{level}.json"
+
+            stats = uploader.upload_file(path, key, compression=compression, level=level)
+            stored = s3.head_object(Bucket=BUCKET, Key=key)["ContentLength"]
+
+            started = time.perf_counter()
+            read_rows(s3, key)
+            read_s = time.perf_counter() - started
+
+            # Saved end to end: wire bytes avoided minus the CPU spent compressing
+            wire_s = stored * 8 / (bandwidth_mbps * 1e6)
+            compress_s = stats["compress_seconds"] if stats else 0.0
+            saved_s = raw_wire_s - wire_s - compress_s
+            print(
+                f"{compression or 'raw':>6} {level or '-':>5} {stored / MB:>10.2f} {size / stored:>6.1f} "
+                f"{compress_s:>10.3f} {read_s:>12.3f} {wire_s:>8.2f} {saved_s:>8.2f}"
+            )
+
+def main():
+    parser = argparse.ArgumentParser(description="Compression ratio and transfer time per codec (moto).")
+    parser.add_argument("--size-mb", type=float, default=64)
+    parser.add_argument("--bandwidth-mbps", type=float, default=200, help="modelled link speed in megabits/s")
+    args = parser.parse_args()
+    logger.remove()  # keep the table readable
+    run(args.size_mb, args.bandwidth_mbps)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+DAG_FILES = ["airflow/dags/json_ingestion_dag.py", "airflow/dags/debug_check_file.py"]
+
+# Must not load while the scheduler parses a DAG file
+HEAVY_MODULES = ["boto3", "botocore", "pandas", "numpy", "sqlalchemy", "pyarrow", "psycopg2", "psycopg", "ijson", "orjson", "loguru", "aioboto3", "asyncpg", "moto"]
+
+# Runs in a fresh interpreter: Airflow itself is imported first, so only the DAG file's own cost is timed
+CHILD = """
+import importlib.util, json, sys, time
+import airflow
+from airflow.operators.python import PythonOperator
+before = set(sys.modules)
+path = sys.argv[1]
+spec = importlib.util.spec_from_file_location("dag_under_test", path)
+module = importlib.util.module_from_spec(spec)
+started = time.perf_counter()
+spec.loader.exec_module(module)
+seconds = time.perf_counter() - started
+print(json.dumps({"seconds": seconds, "modules": sorted(set(sys.modules) - before)}))
+"""
+
+def parse_once(path):
+    result = subprocess.run([sys.executable, "-c", CHILD, path], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def main():
+    parser = argparse.ArgumentParser(description="DAG file parse time and heavy imports, as the scheduler sees them.")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, default=200, help="fail when the median parse exceeds this")
+    parser.add_argument("dag_files", nargs="*", default=DAG_FILES)
+    args = parser.parse_args()
+
+    failed = False
+    for path in args.dag_files:
+        runs = [parse_once(os.path.abspath(path)) for _ in range(args.runs)]
+        median_ms = statistics.median(run["seconds"] for run in runs) * 1000
+        heavy = sorted({name.split(".")[0] for name in runs[-1]["modules"]} & set(HEAVY_MODULES))
+
+        ok = median_ms <= args.budget_ms and not heavy
+        failed |= not ok
+        print(f"{'✅' if ok else '❌'} {path}: {median_ms:.1f} ms median over {args.runs} run(s), {len(runs[-1]['modules'])} new module(s)")
+        if heavy:
+            print(f"   heavy imports at parse time: {', '.join(heavy)}")
+
+    sys.exit(1 if failed else 0)
+
+if __name__ == "__main__":
+    main()
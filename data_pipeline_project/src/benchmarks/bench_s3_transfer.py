@@ -0,0 +1,70 @@
+import argparse
+import configparser
+import os
+import tempfile
+import time
+
+import boto3
+from moto import mock_aws
+
+from src.main.s3.transfer import MB, build_transfer_config, download_to_tempfile
+from src.main.s3.upload_to_s3 import S3Uploader
+
+BUCKET = "bench-bucket"
+
+# (multipart_chunksize_mb, max_concurrency)
+SETTINGS = [(8, 1), (8, 4), (16, 4), (16, 10), (64, 10)]
+
+def make_config(chunk_mb, concurrency):
+    config = configparser.ConfigParser()
+    config.read_dict({"aws": {
+        "multipart_threshold_mb": "8",
+        "multipart_chunksize_mb": str(chunk_mb),
+        "max_concurrency": str(concurrency),
+    }})
+    return config
+
+def write_payload(path, size_mb):
+    # ✅ Repetitive JSON-ish bytes, like our exports
+    line = b'{"name": "Employee", "role": "Backend Developer", "status": "Ongoing"},\n'
+    with open(path, "wb") as f:
+        remaining = size_mb * MB
+        block = line * (MB // len(line))
+        while remaining > 0:
+            f.write(block[:remaining])
+            remaining -= len(block)
+
+@mock_aws
+def run(size_mb):
+    s3 = boto3.client("s3", region_name="us-east-1")
+    s3.create_bucket(Bucket=BUCKET)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "payload.json")
+        write_payload(path, size_mb)
+        size = os.path.getsize(path)
+
+        print(f"{'chunk MB':>8} {'threads':>7} {'upload MB/s':>12} {'download MB/s':>14}")
+        for chunk_mb, concurrency in SETTINGS:
+            transfer_config = build_transfer_config(make_config(chunk_mb, concurrency))
+            uploader = S3Uploader(None, None, "us-east-1", BUCKET, transfer_config=transfer_config)
+            key = f"bench/{chunk_mb}_{concurrency}.json"
+
+            started = time.perf_counter()
+            uploader.upload_file(path, key)
+            upload_s = time.perf_counter() - started
+
+            started = time.perf_counter()
+            download_to_tempfile(s3, BUCKET, key, transfer_config).close()
+            download_s = time.perf_counter() - started
+
+            print(f"{chunk_mb:>8} {concurrency:>7} {size / MB / upload_s:>12.1f} {size / MB / download_s:>14.1f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="S3 transfer throughput per TransferConfig setting (moto).")
+    parser.add_argument("--size-mb", type=int, default=64)
+    args = parser.parse_args()
+    run(args.size_mb)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue
+import resource
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from src.benchmarks.synthetic_data import MB, write_company_of_size
+
+BENCHMARKS = ["flatten", "stream_parse", "db_load", "s3_roundtrip"]
+
+# A child that dies before reporting (missing moto, an exception) fails its bench instead of hanging the suite
+CHILD_TIMEOUT_S = 3600
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def _git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def bench_flatten(path, options):
+    from src.main.utils.flatten_json import flatten_json_file
+    return len(flatten_json_file(path))
+
+def bench_stream_parse(path, options):
+    from src.main.utils.stream_json import iter_employee_rows
+    with open(path, "rb") as f:
+        return sum(1 for _ in iter_employee_rows(f))
+
+class _BenchConnection:
+    def __init__(self, engine):
+        self.engine = engine
+
+def bench_db_load(path, options):
+    from sqlalchemy import create_engine, text
+
+    from src.main.db.bulk_loader import copy_rows, insert_rows
+    from src.main.utils.flatten_json import EMPLOYEE_COLUMNS
+    from src.main.utils.stream_json import iter_employee_batches
+
+    batch_size = options["batch_size"]
+    columns = ", ".join(f"{col} TEXT" for col in EMPLOYEE_COLUMNS)
+
+    with open(path, "rb") as f:
+        batches = iter_employee_batches(f, batch_size)
+
+        if options["postgres_dsn"]:
+            # ✅ Real PostgreSQL: the COPY path
+            engine = create_engine(options["postgres_dsn"])
+            with engine.begin() as conn:
+                conn.execute(text("DROP TABLE IF EXISTS bench_employee_details"))
+                conn.execute(text(f"CREATE UNLOGGED TABLE bench_employee_details ({columns})"))
+            stats = copy_rows(_BenchConnection(engine), batches, table="bench_employee_details")
+            with engine.begin() as conn:
+                conn.execute(text("DROP TABLE bench_employee_details"))
+            engine.dispose()
+            return stats["rows"]
+
+        # ✅ Embedded stand-in: SQLite through the loader's own to_sql fallback
+        from src.main.utils.resources import dispose_all
+        from src.main.utils.settings import settings_from_dict
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            config = settings_from_dict({"database": {"db_type": "sqlite", "database": os.path.join(tmp_dir, "bench.db")}}).config
+            # SQLite has no schemas
+            stats = insert_rows(config, batches, table="employee_details", schema=None)
+            dispose_all()
+            return stats["rows"]
+
+def bench_s3_roundtrip(path, options):
+    import boto3
+    from moto import mock_aws
+
+    from src.main.s3.transfer import ChecksumReader, expected_object_checksum
+    from src.main.s3.upload_to_s3 import S3Uploader
+    from src.main.utils.stream_json import iter_employee_rows
+
+    with mock_aws():
+        s3 = boto3.client("s3", region_name="us-east-1")
+        s3.create_bucket(Bucket="bench-bucket")
+        S3Uploader(None, None, "us-east-1", "bench-bucket").upload_file(path, "bench/data.json")
+
+        obj = s3.get_object(Bucket="bench-bucket", Key="bench/data.json")
+        reader = ChecksumReader(obj["Body"], "bench/data.json", expected_object_checksum(obj), obj["ContentLength"])
+        rows = sum(1 for _ in iter_employee_rows(reader))
+        reader.verify()
+        return rows
+
+# Imported before the clock starts, so timings exclude module import cost
+PRELOAD = {
+    "flatten": ["src.main.utils.flatten_json"],
+    "stream_parse": ["src.main.utils.stream_json"],
+    "db_load": ["pandas", "sqlalchemy", "src.main.db.bulk_loader", "src.main.utils.resources", "src.main.utils.stream_json"],
+    "s3_roundtrip": ["boto3", "moto", "src.main.s3.upload_to_s3", "src.main.utils.stream_json"],
+}
+
+def _run_in_child(name, path, options, results):
+    import importlib
+
+    from loguru import logger
+    logger.remove()  # keep timing free of log I/O
+    for module in PRELOAD.get(name, []):
+        importlib.import_module(module)
+
+    started = time.perf_counter()
+    rows = globals()[f"bench_{name}"](path, options)
+    results.put({"rows": rows, "seconds": time.perf_counter() - started, "peak_rss_mb": _peak_rss_mb()})
+
+def _wait_for_result(proc, results):
+    # Polls so a child that died without reporting is noticed right away, not after CHILD_TIMEOUT_S
+    deadline = time.monotonic() + CHILD_TIMEOUT_S
+    while time.monotonic() < deadline:
+        try:
+            return results.get(timeout=1)
+        except queue.Empty:
+            if not proc.is_alive():
+                try:
+                    return results.get(timeout=1)
+                except queue.Empty:
+                    return None
+    return None
+
+def run_one(name, path, options):
+    # ✅ Fresh process per measurement, so peak RSS belongs to this benchmark alone
+    ctx = multiprocessing.get_context("spawn")
+    results = ctx.Queue()
+    proc = ctx.Process(target=_run_in_child, args=(name, path, options, results))
+    proc.start()
+    result = _wait_for_result(proc, results)
+    proc.join(timeout=10)
+    if proc.is_alive():
+        proc.terminate()
+        proc.join()
+    if result is None or proc.exitcode != 0:
+        raise RuntimeError(f"❌ Benchmark {name} failed (exit code {proc.exitcode})")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline benchmark suite on synthetic data.")
+    parser.add_argument("--sizes-mb", default="1,10,100", help="comma-separated document sizes, e.g. 1,10,100,1000,10000")
+    parser.add_argument("--benchmarks", default=",".join(BENCHMARKS))
+    parser.add_argument("--batch-size", type=int, default=10000)
+    parser.add_argument("--postgres-dsn", default=os.environ.get("BENCH_POSTGRES_DSN"), help="use a real PostgreSQL for db_load")
+    parser.add_argument("--data-dir", default=tempfile.gettempdir())
+    parser.add_argument("--results", default="benchmark_results.jsonl")
+    args = parser.parse_args()
+
+    options = {"batch_size": args.batch_size, "postgres_dsn": args.postgres_dsn}
+    run_meta = {
+        "commit": _git_commit(),
+        "run_at": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+    }
+
+    failed = []
+    for size_mb in [float(size) for size in args.sizes_mb.split(",")]:
+        path = os.path.join(args.data_dir, f"bench_{size_mb:g}mb.json")
+        if not os.path.exists(path):
+            write_company_of_size(path, size_mb)
+        file_mb = os.path.getsize(path) / MB
+
+        for name in args.benchmarks.split(","):
+            try:
+                result = run_one(name, path, options)
+            except RuntimeError as e:
+                print(f"{name:>14} {file_mb:>9.1f} MB FAILED: {e}")
+                failed.append(name)
+                continue
+            record = {
+                **run_meta,
+                "benchmark": name,
+                "size_mb": round(file_mb, 2),
+                "rows": result["rows"],
+                "seconds": round(result["seconds"], 4),
+                "rows_per_sec": round(result["rows"] / result["seconds"], 1),
+                "mb_per_sec": round(file_mb / result["seconds"], 2),
+                "peak_rss_mb": round(result["peak_rss_mb"], 1),
+            }
+            if name == "db_load":
+                record["db"] = "postgresql" if args.postgres_dsn else "sqlite"
+
+            with open(args.results, "a") as f:
+                f.write(json.dumps(record) + "\n")
+            print(f"{name:>14} {file_mb:>9.1f} MB {record['seconds']:>9.3f}s {record['rows_per_sec']:>12,.0f} rows/s {record['peak_rss_mb']:>8.1f} MB peak")
+
+    if failed:
+        raise SystemExit(f"❌ {len(failed)} benchmark run(s) failed: {failed}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+import argparse
+import json
+import os
+import random
+
+ROLES = ["Backend Developer", "Frontend Developer", "Data Engineer", "SEO Analyst", "Content Writer", "QA Engineer"]
+SKILLS = ["Python", "Django", "PostgreSQL", "React", "CSS", "Figma", "Google Analytics", "Content Strategy", "AWS", "Airflow"]
+STATUSES = ["Completed", "Ongoing", "Planned"]
+
+MB = 1024 * 1024
+
+def make_employee(rng, use_campaigns, max_items=3):
+    emp = {
+        "name": f"Employee {rng.randrange(1_000_000)}",
+        "role": rng.choice(ROLES),
+        "skills": rng.sample(SKILLS, rng.randint(1, 4)),
+    }
+    if use_campaigns:
+        emp["campaigns"] = {f"Q{q}": f"Campaign {rng.randrange(100)}" for q in range(1, rng.randint(2, max_items + 2))}
+    else:
+        emp["projects"] = [
+            {"name": f"Project {rng.randrange(500)}", "status": rng.choice(STATUSES)}
+            for _ in range(rng.randint(1, max_items))
+        ]
+    return emp
+
+def make_company(departments=10, employees_per_department=1000, seed=42, campaign_ratio=1 / 3, max_items=3):
+    rng = random.Random(seed)
+    data = {"company": "TechNova Inc", "location": "Bangalore", "departments": {}}
+    for d in range(departments):
+        employees = {}
+        for e in range(employees_per_department):
+            # ✅ Mix both employee shapes, like Engineering vs Marketing in data.json
+            use_campaigns = rng.random() < campaign_ratio
+            employees[f"D{d}E{e}"] = make_employee(rng, use_campaigns, max_items)
+        data["departments"][f"Department {d}"] = {"manager": f"Manager {d}", "employees": employees}
+    return data
+
+def write_company_file(path, departments=10, employees_per_department=1000, seed=42, campaign_ratio=1 / 3, max_items=3):
+    # ✅ Written one employee at a time, so 10 GB documents need no more memory than 1 MB ones
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write('{"company": "TechNova Inc", "location": "Bangalore", "departments": {')
+        for d in range(departments):
+            if d:
+                f.write(", ")
+            f.write(f'"Department {d}": {{"manager": "Manager {d}", "employees": {{')
+            for e in range(employees_per_department):
+                if e:
+                    f.write(", ")
+                use_campaigns = rng.random() < campaign_ratio
+                f.write(f'"D{d}E{e}": ')
+                f.write(json.dumps(make_employee(rng, use_campaigns, max_items)))
+            f.write("}}")
+        f.write("}}")
+    return os.path.getsize(path)
+
+def estimate_employee_bytes(seed=42, campaign_ratio=1 / 3, max_items=3, sample=2000):
+    rng = random.Random(seed)
+    total = sum(
+        len(json.dumps(make_employee(rng, rng.random() < campaign_ratio, max_items))) + 12
+        for _ in range(sample)
+    )
+    return total / sample
+
+def write_company_of_size(path, size_mb, departments=20, seed=42, campaign_ratio=1 / 3, max_items=3):
+    per_employee = estimate_employee_bytes(seed, campaign_ratio, max_items)
+    employees_per_department = max(1, int(size_mb * MB / per_employee / departments))
+    return write_company_file(path, departments, employees_per_department, seed, campaign_ratio, max_items)
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic company document shaped like data.json.")
+    parser.add_argument("path")
+    parser.add_argument("--size-mb", type=float, help="approximate target size; overrides --employees")
+    parser.add_argument("--departments", type=int, default=20)
+    parser.add_argument("--employees", type=int, default=1000, help="employees per department")
+    parser.add_argument("--campaign-ratio", type=float, default=1 / 3, help="share of employees with campaigns instead of projects")
+    parser.add_argument("--max-items", type=int, default=3, help="max projects/campaigns per employee")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    if args.size_mb:
+        size = write_company_of_size(args.path, args.size_mb, args.departments, args.seed, args.campaign_ratio, args.max_items)
+    else:
+        size = write_company_file(args.path, args.departments, args.employees, args.seed, args.campaign_ratio, args.max_items)
+    print(f"wrote {args.path} ({size / MB:.1f} MB)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import asyncio
+import hashlib
+import os
+import time
+from datetime import datetime
+
+import aioboto3
+import asyncpg
+from loguru import logger
+
+from src.main.batch_ingest import archive_local_file, discover_local_files
+from src.main.db.load_json_to_rds import validate_frames
+from src.main.db.rds_connector import PostgresConnection
+from src.main.db.rds_table_manager import RDSTableManager, load_target
+from src.main.s3.transfer import CHECKSUM_METADATA_KEY
+from src.main.utils.flatten_json import flatten_json_tables
+from src.main.utils.mapping_spec import child_specs, get_spec
+from src.main.utils.settings import get_settings, settings_from_config
+
+# Sentinel that tells a COPY worker to stop
+_DONE = object()
+
+def build_asyncpg_dsn(config):
+    return settings_from_config(config).database.asyncpg_dsn
+
+def _read_bytes(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+def _load_targets(config, table):
+    # (spec, table) pairs: the parent table plus any normalised child tables
+    write_mode = settings_from_config(config).load.write_mode
+    return [(get_spec(config), table)] + [(child, load_target(child, write_mode)) for child in child_specs(config)]
+
+def _flatten_records(config, payload, specs, source):
+    # Quarantined rows never reach the COPY queue
+    frames, _ = validate_frames(config, flatten_json_tables(payload, specs), source=source)
+    # ✅ asyncpg's text codec takes str or None only; missing fields come out of pandas as NaN
+    return [list(df.astype(object).where(df.notna(), None).itertuples(index=False, name=None)) for df in frames]
+
+async def extract_file(config, s3, path, semaphore, queue, statuses):
+    aws = settings_from_config(config).aws
+    bucket = aws.bucket_name
+    prefix = aws.s3_key_prefix
+    stem = os.path.splitext(os.path.basename(path))[0]
+    s3_key = os.path.join(prefix, f"{stem}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json")
+    status = statuses[path] = {"source": path, "status": "failed", "s3_key": s3_key, "rows": 0, "error": None}
+
+    async with semaphore:
+        try:
+            payload = await asyncio.to_thread(_read_bytes, path)
+
+            # ✅ Upload, read back and parse overlap across files; only `concurrency` files in flight
+            await s3.put_object(
+                Bucket=bucket,
+                Key=s3_key,
+                Body=payload,
+                Metadata={CHECKSUM_METADATA_KEY: hashlib.sha256(payload).hexdigest()},
+            )
+            obj = await s3.get_object(Bucket=bucket, Key=s3_key)
+            async with obj["Body"] as stream:
+                downloaded = await stream.read()
+            if hashlib.sha256(downloaded).hexdigest() != obj["Metadata"].get(CHECKSUM_METADATA_KEY):
+                raise ValueError(f"❌ Checksum mismatch for {s3_key}")
+
+            # CPU-bound parse runs off the event loop
+            specs = [get_spec(config)] + child_specs(config)
+            tables = await asyncio.to_thread(_flatten_records, config, downloaded, specs, s3_key)
+        except Exception as e:
+            logger.error(f"❌ Failed to extract {path}: {e}")
+            status["error"] = str(e)
+            return
+
+    # ✅ Bounded queue: when COPY falls behind, extraction waits here (backpressure)
+    await queue.put((path, tables))
+
+async def copy_worker(config, pool, queue, table, statuses):
+    schema = settings_from_config(config).database.schema
+    while True:
+        item = await queue.get()
+        if item is _DONE:
+            return
+
+        path, tables = item
+        status = statuses[path]
+        try:
+            async with pool.acquire() as conn:
+                # ✅ Parent and child tables of one file commit together
+                async with conn.transaction():
+                    for (spec, target), records in zip(_load_targets(config, table), tables):
+                        if records:
+                            await conn.copy_records_to_table(target, records=records, columns=spec.columns, schema_name=schema)
+            status["rows"] = len(tables[0])
+            # Archived by run() once finish_load has made the rows live
+            status["status"] = "loaded"
+        except Exception as e:
+            logger.error(f"❌ Failed to load {path}: {e}")
+            status["error"] = str(e)
+
+async def run_async(config, paths, table):
+    concurrency = config.getint("async", "concurrency", fallback=16)
+    db_workers = config.getint("async", "db_workers", fallback=4)
+    queue_size = config.getint("async", "queue_size", fallback=32)
+    schema = settings_from_config(config).database.schema
+
+    statuses = {}
+    queue = asyncio.Queue(maxsize=queue_size)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    aws = settings_from_config(config).aws
+    session = aioboto3.Session(
+        aws_access_key_id=aws.aws_access_key_id,
+        aws_secret_access_key=aws.aws_secret_access_key,
+        region_name=aws.region_name,
+    )
+    pool = await asyncpg.create_pool(
+        build_asyncpg_dsn(config),
+        min_size=1,
+        max_size=db_workers,
+        server_settings={"search_path": schema},
+    )
+    try:
+        async with session.client("s3", endpoint_url=aws.endpoint_url) as s3:
+            workers = [asyncio.create_task(copy_worker(config, pool, queue, table, statuses)) for _ in range(db_workers)]
+            await asyncio.gather(*(extract_file(config, s3, path, semaphore, queue, statuses) for path in paths))
+            for _ in workers:
+                await queue.put(_DONE)
+            await asyncio.gather(*workers)
+    finally:
+        await pool.close()
+
+    return list(statuses.values())
+
+def run(config):
+    write_mode = settings_from_config(config).load.write_mode
+    paths = discover_local_files(config)
+    if not paths:
+        logger.warning("⚠️ No pending files found. Nothing to ingest.")
+        return []
+
+    # ✅ Table DDL and the upsert merge stay on the existing sync path
+    db_connection = PostgresConnection(config)
+    db_connection.connect()
+    try:
+        table_manager = RDSTableManager(db_connection)
+        table = table_manager.prepare_load(write_mode)
+
+        started = time.perf_counter()
+        statuses = asyncio.run(run_async(config, paths, table))
+        elapsed = time.perf_counter() - started
+
+        table_manager.finish_load(write_mode)
+    finally:
+        db_connection.close()
+
+    # ✅ Only after finish_load: a failed merge or swap leaves the files in place for the rerun
+    for status in statuses:
+        if status["status"] == "loaded":
+            status["archived_to"] = archive_local_file(config, status["source"])
+
+    failed = [s for s in statuses if s["status"] != "loaded"]
+    rows = sum(s["rows"] for s in statuses)
+    logger.info(
+        f"🏁 Async run: {len(statuses) - len(failed)} loaded, {len(failed)} failed, {rows} rows in {elapsed:.2f}s "
+        f"({len(statuses) / elapsed * 60:.1f} files/min)"
+    )
+    if failed:
+        raise RuntimeError(f"❌ {len(failed)} file(s) failed: {[s['source'] for s in failed]}")
+    return statuses
+
+def main():
+    run(get_settings(os.path.abspath("resources/config.ini")).config)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,205 @@
+import fnmatch
+import glob
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+
+from loguru import logger
+
+from src.main.db.checkpoint import checkpoint_for, get_checkpoints
+from src.main.db.load_json_to_rds import capture_object_changes, load_s3_object
+from src.main.db.rds_connector import PostgresConnection
+from src.main.db.rds_table_manager import RDSTableManager
+from src.main.s3.transfer import path_sha256
+from src.main.s3.upload_to_s3 import upload_local_file
+from src.main.utils.manifest import get_manifest
+from src.main.utils.resources import s3_client_from_config
+from src.main.utils.settings import get_settings, project_path, settings_from_config, settings_from_dict
+
+
+def get_landing_dir(config):
+    default_dir = os.path.dirname(config["local"]["json_file_path"])
+    return os.path.abspath(config["local"].get("json_dir", default_dir))
+
+def discover_local_files(config):
+    pattern = settings_from_config(config).batch.pattern
+    files = sorted(glob.glob(os.path.join(get_landing_dir(config), pattern)))
+    logger.info(f"🔍 Found {len(files)} pending file(s) in {get_landing_dir(config)}")
+    return files
+
+def discover_s3_keys(config):
+    settings = settings_from_config(config)
+    bucket = settings.aws.bucket_name
+    prefix = config.get("batch", "s3_prefix", fallback=settings.aws.s3_key_prefix)
+    pattern = settings.batch.pattern
+
+    keys = []
+    paginator = s3_client_from_config(config).get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for item in page.get("Contents", []):
+            if fnmatch.fnmatch(os.path.basename(item["Key"]), pattern):
+                keys.append(item["Key"])
+
+    logger.info(f"🔍 Found {len(keys)} pending object(s) under s3://{bucket}/{prefix}")
+    return sorted(keys)
+
+def archive_local_file(config, json_path):
+    archive_dir = project_path(config["local"].get("archive_dir", "data_uploads/archive"))
+    os.makedirs(archive_dir, exist_ok=True)
+
+    stem, ext = os.path.splitext(os.path.basename(json_path))
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    archived_path = os.path.join(archive_dir, f"{stem}_{timestamp}{ext}")
+    shutil.move(json_path, archived_path)
+    logger.info(f"📦 Archived {json_path} -> {archived_path}")
+    return archived_path
+
+def archive_s3_object(config, s3_key):
+    archive_prefix = config.get("batch", "s3_archive_prefix", fallback="")
+    if not archive_prefix:
+        return None
+
+    bucket = settings_from_config(config).aws.bucket_name
+    archived_key = os.path.join(archive_prefix, os.path.basename(s3_key))
+    s3 = s3_client_from_config(config)
+    s3.copy_object(Bucket=bucket, Key=archived_key, CopySource={"Bucket": bucket, "Key": s3_key})
+    s3.delete_object(Bucket=bucket, Key=s3_key)
+    logger.info(f"📦 Archived s3://{bucket}/{s3_key} -> {archived_key}")
+    return archived_key
+
+def _config_to_dict(config):
+    return {section: dict(config.items(section, raw=True)) for section in config.sections()}
+
+def load_id_for(source, source_type, manifest=None):
+    # ✅ Content-stable checkpoint id for local files; a listed S3 key is already stable
+    if source_type != "local":
+        return source
+    return manifest.fingerprint(source)["content_hash"] if manifest else path_sha256(source)
+
+def ingest_one(config_dict, source, source_type, table, load_id=None):
+    # ✅ Runs inside a pool worker: plain dict in, plain dict out (picklable)
+    # Same dict, same parsed config: thread workers share one settings object
+    config = settings_from_dict(config_dict).config
+    status = {"source": source, "status": "failed", "s3_key": None, "rows": 0, "seconds": 0.0, "error": None}
+    started = time.perf_counter()
+
+    manifest = get_manifest(config) if source_type == "local" else None
+    db_connection = PostgresConnection(config)
+    try:
+        fingerprint = manifest.fingerprint(source) if manifest else None
+        if fingerprint and manifest.is_loaded(fingerprint["content_hash"]):
+            logger.info(f"⏭️ {source} unchanged since last load; archiving without reloading.")
+            status["archived_to"] = archive_local_file(config, source)
+            status["status"] = "skipped"
+            return status
+
+        if source_type == "local":
+            stem = os.path.splitext(os.path.basename(source))[0]
+            s3_key = upload_local_file(config, source, file_stem=stem)
+            if fingerprint:
+                manifest.record_upload(fingerprint, s3_key)
+        else:
+            s3_key = source
+        status["s3_key"] = s3_key
+
+        db_connection.connect()
+        # ✅ Keyed by content (not the timestamped S3 key), so a rerun finds this file's progress
+        checkpoint = checkpoint_for(get_checkpoints(config), load_id)
+        status["rows"] = load_s3_object(config, db_connection, s3_key, table=table, checkpoint=checkpoint)
+        status["fingerprint"] = fingerprint
+        # Marked loaded and archived by run_batch once the load is final
+        status["status"] = "loaded"
+    except Exception as e:
+        logger.error(f"❌ Failed to ingest {source}: {e}")
+        status["error"] = str(e)
+    finally:
+        db_connection.close()
+        status["seconds"] = round(time.perf_counter() - started, 3)
+
+    return status
+
+def finalize_loaded(config, source_type, statuses):
+    # ✅ Only after finish_load: a file is never marked loaded for rows that did not go live
+    manifest = get_manifest(config) if source_type == "local" else None
+    for status in statuses:
+        if status["status"] != "loaded":
+            continue
+        # Before archiving, which moves the S3 object
+        capture_object_changes(config, status["s3_key"])
+        if manifest and status.get("fingerprint"):
+            manifest.mark_loaded(status["fingerprint"])
+        if source_type == "local":
+            status["archived_to"] = archive_local_file(config, status["source"])
+        else:
+            status["archived_to"] = archive_s3_object(config, status["s3_key"])
+
+def run_batch(config):
+    settings = settings_from_config(config)
+    source_type = settings.batch.source
+    workers = settings.batch.workers
+    executor_kind = settings.batch.executor
+    write_mode = settings.load.write_mode
+
+    sources = discover_local_files(config) if source_type == "local" else discover_s3_keys(config)
+    if not sources:
+        logger.warning("⚠️ No pending files found. Nothing to ingest.")
+        return []
+
+    # ✅ Table DDL once up front; every worker appends into the same target
+    db_connection = PostgresConnection(config)
+    db_connection.connect()
+    try:
+        table_manager = RDSTableManager(db_connection)
+        checkpoints = get_checkpoints(config)
+        load_ids = {}
+        if checkpoints is not None:
+            manifest = get_manifest(config) if source_type == "local" else None
+            load_ids = {source: load_id_for(source, source_type, manifest) for source in sources}
+        resume = checkpoints is not None and checkpoints.resume(list(load_ids.values()), table_manager.load_targets(write_mode))
+        target_table = table_manager.prepare_load(write_mode, resume=resume)
+
+        executor_cls = ProcessPoolExecutor if executor_kind == "process" else ThreadPoolExecutor
+        logger.info(f"🚀 Ingesting {len(sources)} file(s) with {workers} {executor_kind} worker(s)")
+
+        started = time.perf_counter()
+        config_dict = _config_to_dict(config)
+        statuses = []
+        with executor_cls(max_workers=workers) as pool:
+            futures = [
+                pool.submit(ingest_one, config_dict, source, source_type, target_table, load_ids.get(source))
+                for source in sources
+            ]
+            for future in as_completed(futures):
+                status = future.result()
+                statuses.append(status)
+                logger.info(f"📄 {status['source']}: {status['status']} ({status['rows']} rows, {status['seconds']}s)")
+
+        # ✅ Merge once for all files (upsert mode). With checkpoints, a failed batch is left
+        # unfinished: the rerun picks up the failed files and resumes into the same targets.
+        # Loaded files stay pending until then, so the rerun still counts them as part of this load.
+        if checkpoints is not None and any(status["status"] == "failed" for status in statuses):
+            logger.warning("⚠️ Leaving the load unfinished so the next run can resume it.")
+        else:
+            table_manager.finish_load(write_mode, checkpoints=checkpoints)
+            finalize_loaded(config, source_type, statuses)
+    finally:
+        db_connection.close()
+
+    elapsed = time.perf_counter() - started
+    failed = [s for s in statuses if s["status"] == "failed"]
+    logger.info(
+        f"🏁 Batch finished in {elapsed:.2f}s: {len(statuses) - len(failed)} loaded or skipped, {len(failed)} failed "
+        f"({len(statuses) / elapsed * 60:.1f} files/min)"
+    )
+
+    if failed:
+        raise RuntimeError(f"❌ {len(failed)} file(s) failed: {[s['source'] for s in failed]}")
+    return statuses
+
+def main():
+    run_batch(get_settings(os.path.abspath("resources/config.ini")).config)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+import io
+import time
+
+import pandas as pd
+from loguru import logger
+
+from src.main.utils.flatten_json import EMPLOYEE_COLUMNS
+from src.main.utils.metrics import track_stage
+from src.main.utils.resources import engine_from_config
+from src.main.utils.settings import settings_from_config
+
+def is_postgres(config):
+    return settings_from_config(config).database.is_postgres
+
+def get_batch_size(config):
+    return settings_from_config(config).load.batch_size
+
+def _csv_field(value):
+    # ✅ Unquoted empty = NULL, quoted = text (so "" and None stay distinct)
+    if value is None or value != value:  # None or NaN
+        return ""
+    return '"' + str(value).replace('"', '""') + '"'
+
+def rows_to_csv(rows, columns):
+    buffer = io.StringIO()
+    for row in rows:
+        if isinstance(row, dict):
+            row = [row.get(col) for col in columns]
+        buffer.write(",".join(_csv_field(value) for value in row))
+        buffer.write("\n")
+    buffer.seek(0)
+    return buffer
+
+def iter_dataframe_batches(df, batch_size, columns=EMPLOYEE_COLUMNS):
+    df = df.reindex(columns=columns)
+    for start in range(0, len(df), batch_size):
+        chunk = df.iloc[start:start + batch_size]
+        yield list(chunk.itertuples(index=False, name=None))
+
+def _copy_buffer(cursor, copy_sql, buffer):
+    # psycopg2 exposes copy_expert, psycopg 3 exposes a copy() context manager
+    if hasattr(cursor, "copy_expert"):
+        cursor.copy_expert(copy_sql, buffer)
+    else:
+        with cursor.copy(copy_sql) as copy:
+            copy.write(buffer.getvalue())
+
+def skip_rows(batches, count):
+    # ✅ Drops rows an earlier attempt already committed; whole batches are skipped without copying
+    for batch in batches:
+        if count >= len(batch):
+            count -= len(batch)
+            continue
+        yield batch[count:] if count else batch
+        count = 0
+
+def copy_rows(db_connection, batches, table="employee_details", schema="public", columns=EMPLOYEE_COLUMNS,
+              checkpoint=None, resumed_rows=0):
+    column_list = ", ".join(columns)
+    copy_sql = f"COPY {schema}.{table} ({column_list}) FROM STDIN WITH (FORMAT csv)"
+
+    total_rows = 0
+    batch_no = 0
+    started = time.perf_counter()
+
+    # ✅ Raw DBAPI connection from the existing engine; one transaction for the whole load,
+    # or one per batch (rows + progress together) when checkpointing
+    raw_conn = db_connection.engine.raw_connection()
+    try:
+        cursor = raw_conn.cursor()
+        for batch in batches:
+            _copy_buffer(cursor, copy_sql, rows_to_csv(batch, columns))
+            total_rows += len(batch)
+            batch_no += 1
+            if checkpoint is not None:
+                checkpoint.record(cursor, table, resumed_rows + total_rows, batch_no)
+                raw_conn.commit()
+            logger.debug(f"📤 COPY batch: {len(batch)} rows ({total_rows} total)")
+        raw_conn.commit()
+        cursor.close()
+    except Exception:
+        raw_conn.rollback()
+        raise
+    finally:
+        raw_conn.close()
+
+    return _report(f"{schema}.{table}", "COPY", total_rows, started)
+
+def insert_rows(config, batches, table="employee_details", schema="public", columns=EMPLOYEE_COLUMNS):
+    total_rows = 0
+    started = time.perf_counter()
+
+    engine = engine_from_config(config)
+    for batch in batches:
+        df = pd.DataFrame(batch, columns=columns)
+        df.to_sql(
+            name=table,
+            con=engine,
+            schema=schema,
+            if_exists="append",
+            index=False,
+            method="multi"
+        )
+        total_rows += len(df)
+        logger.debug(f"📤 INSERT batch: {len(df)} rows ({total_rows} total)")
+
+    return _report(f"{schema}.{table}", "to_sql", total_rows, started)
+
+def _report(target, method, total_rows, started):
+    elapsed = time.perf_counter() - started
+    rows_per_sec = total_rows / elapsed if elapsed > 0 else 0.0
+    logger.info(f"🚚 {method} loaded {total_rows} rows into {target} in {elapsed:.2f}s ({rows_per_sec:,.0f} rows/sec)")
+    return {"rows": total_rows, "seconds": elapsed, "rows_per_sec": rows_per_sec, "method": method}
+
+def bulk_load_rows(config, db_connection, batches, table="employee_details", columns=EMPLOYEE_COLUMNS, checkpoint=None,
+                   resumed_rows=None):
+    schema = settings_from_config(config).database.schema
+    if checkpoint is not None and resumed_rows is None:
+        resumed_rows = checkpoint.rows_committed(table)
+        batches = skip_rows(batches, resumed_rows)
+    resumed_rows = resumed_rows or 0
+    if resumed_rows:
+        logger.info(f"⏩ Resuming {table}: {resumed_rows} rows already committed by an earlier attempt")
+
+    with track_stage("db_write") as stage:
+        if is_postgres(config):
+            stats = copy_rows(db_connection, batches, table=table, schema=schema, columns=columns,
+                              checkpoint=checkpoint, resumed_rows=resumed_rows)
+        else:
+            # ✅ Fallback for non-Postgres db_type values
+            logger.info(f"ℹ️ db_type is not PostgreSQL; falling back to DataFrame.to_sql for {table}.")
+            stats = insert_rows(config, batches, table=table, schema=schema, columns=columns)
+        stage.rows = stats["rows"]
+
+    # rows: everything now in the target for this source, including rows resumed from a checkpoint
+    stats["resumed_rows"] = resumed_rows
+    stats["rows"] += resumed_rows
+    return stats
+
+def bulk_load_dataframe(config, db_connection, df, table="employee_details", columns=EMPLOYEE_COLUMNS, checkpoint=None):
+    batches = iter_dataframe_batches(df, get_batch_size(config), columns)
+    return bulk_load_rows(config, db_connection, batches, table=table, columns=columns, checkpoint=checkpoint)
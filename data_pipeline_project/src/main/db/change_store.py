@@ -0,0 +1,107 @@
+import pandas as pd
+from sqlalchemy import text
+from loguru import logger
+
+from src.main.db.bulk_loader import _copy_buffer, is_postgres, rows_to_csv
+from src.main.utils.change_capture import ChangeCapture, ParquetChangeStore, change_columns
+from src.main.utils.mapping_spec import get_spec
+from src.main.utils.resources import engine_from_config
+from src.main.utils.settings import project_path, settings_from_config
+
+class PostgresChangeStore:
+    """Compact hash index ({name}_hash_index) and the delta stream ({name}_changes) in PostgreSQL."""
+
+    def __init__(self, config):
+        self.config = config
+        self.schema = settings_from_config(config).database.schema
+        self.engine = engine_from_config(config)
+        self._ready = set()
+
+    def index_table(self, spec):
+        return f"{self.schema}.{spec.name}_hash_index"
+
+    def changes_table(self, spec):
+        return f"{self.schema}.{spec.name}_changes"
+
+    def ensure_tables(self, spec):
+        if spec.name in self._ready:
+            return
+        key_defs = ", ".join(f"{column} {spec.types[column]} NOT NULL" for column in spec.key)
+        # ✅ Key + one BIGINT per row: a few dozen bytes per employee instead of the full row
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {self.index_table(spec)} ({key_defs}, row_hash BIGINT NOT NULL, PRIMARY KEY ({', '.join(spec.key)}));",
+            spec.create_table_sql(
+                self.schema,
+                table=f"{spec.name}_changes",
+                if_not_exists=True,
+                extra_columns=["change_type TEXT NOT NULL", "row_hash BIGINT NOT NULL", "run_id TEXT NOT NULL",
+                               "changed_at TIMESTAMPTZ NOT NULL DEFAULT now()"],
+            ),
+            f"CREATE INDEX IF NOT EXISTS {spec.name}_changes_run_idx ON {self.changes_table(spec)} (run_id);",
+        ]
+        with self.engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+        self._ready.add(spec.name)
+
+    def _scope_filter(self, spec, scopes, placeholder=":{}"):
+        # Rows of the document scopes (companies) in this snapshot; other companies are left alone
+        if not spec.document_key:
+            return "", {}
+        params = {}
+        tuples = []
+        for i, scope in enumerate(scopes):
+            names = [f"s{i}_{j}" for j in range(len(scope))]
+            params.update(zip(names, scope))
+            tuples.append("(" + ", ".join(placeholder.format(name) for name in names) + ")")
+        return f" WHERE ({', '.join(spec.document_key)}) IN ({', '.join(tuples)})", params
+
+    def previous_index(self, spec, scopes):
+        self.ensure_tables(spec)
+        where, params = self._scope_filter(spec, scopes)
+        with self.engine.connect() as conn:
+            return pd.read_sql(text(f"SELECT {', '.join(spec.key)}, row_hash FROM {self.index_table(spec)}{where}"), conn, params=params)
+
+    def write(self, spec, changes, index, scopes, run_id):
+        self.ensure_tables(spec)
+        # The DBAPI cursor takes %(name)s placeholders
+        where, params = self._scope_filter(spec, scopes, placeholder="%({})s")
+        delete_sql = f"DELETE FROM {self.index_table(spec)}{where};"
+        index_copy = f"COPY {self.index_table(spec)} ({', '.join(spec.key)}, row_hash) FROM STDIN WITH (FORMAT csv)"
+        columns = change_columns(spec) + ["run_id"]
+        changes_copy = f"COPY {self.changes_table(spec)} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+        # ✅ One transaction: the delta and the new index land together, or neither does
+        raw_conn = self.engine.raw_connection()
+        try:
+            cursor = raw_conn.cursor()
+            cursor.execute(delete_sql, params)
+            _copy_buffer(cursor, index_copy, rows_to_csv(index[spec.key + ["row_hash"]].itertuples(index=False, name=None), spec.key))
+            if len(changes):
+                # Columns a delete does not carry are NaN and go in as NULL
+                rows = changes.assign(run_id=run_id)[columns]
+                _copy_buffer(cursor, changes_copy, rows_to_csv(rows.itertuples(index=False, name=None), columns))
+            raw_conn.commit()
+            cursor.close()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+        logger.info(f"🔁 Wrote {len(changes)} change(s) to {self.changes_table(spec)} and {len(index)} hashes to {self.index_table(spec)}")
+
+def cdc_enabled(config):
+    return config.getboolean("cdc", "enabled", fallback=False)
+
+def get_change_capture(config, spec=None, run_id=None):
+    if not cdc_enabled(config):
+        return None
+    target = config.get("cdc", "target", fallback="postgres")
+    if target == "parquet":
+        store = ParquetChangeStore(config, project_path(config.get("cdc", "uri", fallback="data_uploads/cdc")))
+    elif is_postgres(config):
+        store = PostgresChangeStore(config)
+    else:
+        logger.warning("⚠️ [cdc] target = postgres needs PostgreSQL; change capture is off.")
+        return None
+    return ChangeCapture(spec or get_spec(config), store, run_id=run_id)
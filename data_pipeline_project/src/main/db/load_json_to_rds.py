@@ -1,105 +1,303 @@
-import boto3
-import json
-import pandas as pd
-import tempfile
-import os
 from loguru import logger
-from sqlalchemy import text # Make sure sqlalchemy is imported here, though it's implicitly used by pandas
 
-from src.main.utils.flatten_json import flatten_json_file
+from src.main.db.bulk_loader import bulk_load_dataframe, bulk_load_rows, get_batch_size
+from src.main.db.change_store import get_change_capture
+from src.main.db.quarantine_store import get_quarantine_store, get_validator
+from src.main.s3.transfer import ChecksumReader, DecompressingReader, build_transfer_config, content_encoding
+from src.main.s3.transfer import download_to_tempfile, expected_object_checksum
+from src.main.db.rds_table_manager import load_target
+from src.main.utils.flatten_json import flatten_json_tables
+from src.main.utils.mapping_spec import EMPLOYEE_SPEC, child_specs, get_spec, normalize_enabled
+from src.main.utils.metrics import track_stage
+from src.main.utils.parquet_stage import iter_stage_batches, stage_exists, stage_roots, stage_uri_for, staging_enabled, write_stage
+from src.main.utils.resources import s3_client_from_config
+from src.main.utils.settings import settings_from_config
+from src.main.utils.stream_json import iter_employee_batches
+from src.main.utils.validation import RowValidator
 
-def load_json_to_rds(config, db_connection, s3_key):
-    bucket = config["aws"]["bucket_name"]
-    region = config["aws"]["region_name"]
-    schema = config["database"].get("schema", "public")
+def open_s3_object(config, s3_key):
+    aws = settings_from_config(config).aws
+    bucket = aws.bucket_name
 
-    access_key = config["aws"].get("aws_access_key_id")
-    secret_key = config["aws"].get("aws_secret_access_key")
+    logger.info(f"☁️ Connecting to S3 bucket: {bucket}, key: {s3_key}")
 
-    try:
-        logger.info(f"☁️ Connecting to S3 bucket: {bucket}, key: {s3_key}")
-
-        # ✅ Initialize S3 client
-        s3 = boto3.client(
-            "s3",
-            aws_access_key_id=access_key,
-            aws_secret_access_key=secret_key,
-            region_name=region
-        )
-        logger.info("✅ S3 client initialized.")
+    # ✅ Shared S3 client from the process-level registry
+    s3 = s3_client_from_config(config)
 
-        # ✅ Read S3 object
+    # ✅ ranged: concurrent ranged GETs into a temp file, verified before use
+    if aws.download_mode == "ranged":
+        head = s3.head_object(Bucket=bucket, Key=s3_key)
+        with track_stage("s3_read") as stage:
+            body = download_to_tempfile(s3, bucket, s3_key, build_transfer_config(config), head=head)
+            stage.bytes = body.seek(0, 2)
+            body.seek(0)
+        encoding = content_encoding(head, s3_key)
+    else:
+        # ✅ stream: the body is a file-like stream, verified when the reader hits EOF
         obj = s3.get_object(Bucket=bucket, Key=s3_key)
-        json_data = obj["Body"].read().decode("utf-8")
-        data = json.loads(json_data)
-        logger.success("📥 JSON data downloaded and loaded into memory.")
-
-        # ✅ Write to temporary file
-        with tempfile.NamedTemporaryFile(mode="w+", suffix=".json", delete=False) as tmp:
-            json.dump(data, tmp)
-            tmp_path = tmp.name
-        logger.info(f"📝 JSON temporarily written to: {tmp_path}")
-
-        # ✅ Flatten the JSON file
-        df = flatten_json_file(tmp_path)
-        os.remove(tmp_path)
-        logger.success("📄 JSON successfully flattened into DataFrame.")
+        body = ChecksumReader(obj["Body"], s3_key, expected_object_checksum(obj), obj["ContentLength"])
+        encoding = content_encoding(obj, s3_key)
 
-        if df.empty:
-            logger.warning("⚠️ Flattened DataFrame is empty. Skipping RDS load.")
-            return
-
-        logger.info(f"📐 DataFrame shape: {df.shape}")
-        logger.info(f"📊 DataFrame preview:\n{df.head(2).to_string()}")
-
-        if "id" in df.columns:
-            logger.warning("🧹 Dropping 'id' column from DataFrame to avoid primary key conflict.")
-            df.drop(columns=["id"], inplace=True)
-
-        logger.debug(f"🧪 DataFrame columns: {df.columns.tolist()}")
-        logger.debug(f"🧪 DataFrame dtypes:\n{df.dtypes}")
-
-        # --- START OF MODIFICATION FOR PANDAS TO_SQL ---
-        # Reconstruct the connection string using the config object
-        # This is needed because Pandas might have issues recognizing the SQLAlchemy Engine
-        # passed directly in some environments, or might expect a URI string for internal engine creation.
-        db_config = config["database"]
-        user = db_config["user"]
-        password = db_config["password"]
-        host = db_config["host"]
-        port = db_config["port"]
-        database_name = db_config["database"] # 'database' is also a key in your config
-        db_type = db_config.get("db_type", "postgresql")
-        schema = db_config.get("schema", "public")
-
-        connection_string_for_pandas = (
-            f"{db_type}://{user}:{password}@{host}:{port}/{database_name}"
-            f"?options=-csearch_path={schema}"
-        )
-        # Log a masked version of the connection string for security
-        logger.debug(f"Constructed connection string for Pandas: {connection_string_for_pandas.split('//')[0]}//****:****@{connection_string_for_pandas.split('@')[1]}")
-
-        logger.info("📤 Writing data to RDS using database connection string for Pandas...")
-        df.to_sql(
-            name="employee_details",
-            con=connection_string_for_pandas, # <--- THIS IS THE KEY CHANGE
-            schema=schema,
-            if_exists="append",
-            index=False,
-            method="multi" # 'multi' is generally efficient for bulk inserts
-        )
-        # --- END OF MODIFICATION ---
+    # ✅ gzip/zstd objects are decoded on the fly; the parser never sees a fully inflated copy
+    return DecompressingReader(body, encoding, s3_key) if encoding else body
+
+def _log_row_count(table, rows):
+    # ✅ Load counter instead of a full COUNT(*) scan; finish_load logs the pg_class estimate after ANALYZE
+    logger.info(f"📊 Rows loaded into '{table}': {rows}")
+
+def load_dataframe_to_rds(config, db_connection, df, table="employee_details", checkpoint=None):
+    if df.empty:
+        logger.warning("⚠️ Flattened DataFrame is empty. Skipping RDS load.")
+        return 0
+
+    logger.info(f"📐 DataFrame shape: {df.shape}")
+    logger.info(f"📊 DataFrame preview:\n{df.head(2).to_string()}")
+
+    if "id" in df.columns:
+        logger.warning("🧹 Dropping 'id' column from DataFrame to avoid primary key conflict.")
+        df.drop(columns=["id"], inplace=True)
+
+    logger.debug(f"🧪 DataFrame columns: {df.columns.tolist()}")
+    logger.debug(f"🧪 DataFrame dtypes:\n{df.dtypes}")
+
+    # ✅ COPY FROM STDIN on PostgreSQL, DataFrame.to_sql for other db_type values
+    logger.info("📤 Writing data to RDS with the bulk loader...")
+    bulk_load_dataframe(config, db_connection, df, table=table, columns=list(df.columns), checkpoint=checkpoint)
+
+    logger.success("✅ Data loaded successfully into RDS.")
+    _log_row_count(table, len(df))
+    return len(df)
 
-        logger.success("✅ Data loaded successfully into RDS.")
+def _require_streamable(config, mode):
+    # The ijson state machine walks the employee layout only; other specs use the in-memory path
+    if get_spec(config) is not EMPLOYEE_SPEC:
+        raise ValueError(f"❌ {mode} supports only the built-in employee mapping; disable it for [mapping] spec_path feeds.")
+    if normalize_enabled(config):
+        raise ValueError(f"❌ {mode} does not build normalised child tables; disable it or [load] normalize.")
+
+def flatten_for_load(config, source):
+    # ✅ One parse: parent rows plus, with [load] normalize, one frame per child table
+    return flatten_json_tables(source, [get_spec(config)] + child_specs(config))
+
+def validate_frames(config, frames, source=None):
+    # ✅ Between flatten and load: bad rows go to the quarantine, the rest continue to the bulk loader
+    df, *child_frames = frames
+    validator = get_validator(config, source=source)
+    df = validator.validate(df)
+    validator.finish()
+    dropped = validator.quarantined_keys()
+    valid_children = []
+    for child, child_df in zip(child_specs(config), child_frames):
+        child_validator = validator.for_spec(child)
+        valid_children.append(child_validator.validate(child_df, drop_keys=dropped))
+        child_validator.finish()
+    return [df] + valid_children, dropped
+
+def load_frames_to_rds(config, db_connection, frames, table="employee_details", checkpoint=None, source=None, capture=None):
+    write_mode = settings_from_config(config).load.write_mode
+    document_scope = frames[0].attrs.get("document_scope")
+    (df, *child_frames), quarantined_keys = validate_frames(config, frames, source=source)
+    if capture is not None:
+        if document_scope is not None:
+            capture.add_scopes([document_scope])
+        # Hashed before the load: load_dataframe_to_rds may drop columns in place
+        capture.feed(df)
+        capture.hold(quarantined_keys)
+    rows = load_dataframe_to_rds(config, db_connection, df, table=table, checkpoint=checkpoint)
+    for child, child_df in zip(child_specs(config), child_frames):
+        logger.info(f"🧩 Loading {len(child_df)} rows into child table {child.table}")
+        load_dataframe_to_rds(config, db_connection, child_df, table=load_target(child, write_mode), checkpoint=checkpoint)
+    # The caller finishes the capture after finish_load: a failed merge or swap must not publish a delta
+    return rows
+
+def _verified_batches(source, batch_size, roots=None):
+    yield from iter_employee_batches(source, batch_size, roots)
+    # ✅ Runs before the bulk loader commits, so a truncated object is never loaded
+    if hasattr(source, "verify"):
+        source.verify()
+
+def load_stream_to_rds(config, db_connection, source, table="employee_details", batch_size=None, checkpoint=None,
+                       source_name=None, capture=None):
+    _require_streamable(config, "Streaming load")
+    if batch_size is None:
+        batch_size = get_batch_size(config)
+
+    logger.info(f"🌊 Streaming rows in batches of {batch_size}")
+    validator = get_validator(config, source=source_name)
+    roots = []
+    batches = validator.wrap(_verified_batches(source, batch_size, roots))
+    # ✅ The diff sees every parsed row, including rows a resumed load skips
+    if capture is not None:
+        batches = capture.wrap(batches)
+    with track_stage("stream_load") as stage:
+        # With checkpoints, batches before the end-of-stream checksum are committed as they arrive
+        stats = bulk_load_rows(config, db_connection, batches, table=table, checkpoint=checkpoint)
+        total_rows = stage.rows = stats["rows"]
+        stage.bytes = getattr(source, "bytes_read", None)
+    if capture is not None:
+        capture.add_scopes(capture.spec.document_scope(root) for root in roots)
+        capture.hold(validator.quarantined_keys())
+
+    if total_rows == 0:
+        logger.warning("⚠️ No employee records found in JSON. Nothing loaded into RDS.")
+        return 0
+
+    logger.success(f"✅ Streamed {total_rows} rows into RDS.")
+    _log_row_count(table, total_rows)
+    return total_rows
+
+def load_json_to_rds(config, db_connection, s3_key, table="employee_details", checkpoint=None, capture=None):
+    try:
+        # ✅ Flatten straight from the S3 body: no temp file, no second parse
+        body = open_s3_object(config, s3_key)
+        if settings_from_config(config).aws.download_mode == "ranged":
+            # Already downloaded and recorded as s3_read by open_s3_object; this reads the local temp file
+            payload = body.read()
+        else:
+            with track_stage("s3_read") as stage:
+                payload = body.read()
+                stage.bytes = len(payload)
+        if hasattr(body, "verify"):
+            body.verify()
+        body.close()
+
+        frames = flatten_for_load(config, payload)
+        del payload
+        logger.success("📄 JSON successfully flattened into DataFrame.")
 
-        # ✅ Optional row count check
-        # Use db_connection.engine here because this object is confirmed to be properly
-        # instantiated as a PostgresConnection and holds a valid SQLAlchemy Engine.
-        with db_connection.engine.connect() as conn:
-            result = conn.execute(text(f"SELECT COUNT(*) FROM {schema}.employee_details"))
-            logger.info(f"📊 Row count in 'employee_details': {result.scalar()}")
+        return load_frames_to_rds(config, db_connection, frames, table=table, checkpoint=checkpoint, source=s3_key, capture=capture)
 
     except Exception as e:
         logger.error("❌ Exception occurred while processing JSON from S3.")
         logger.exception(e) # This prints the full traceback to the log
-        raise e # Re-raise the exception to propagate it up to Airflow
\ No newline at end of file
+        raise e # Re-raise the exception to propagate it up to Airflow
+
+def load_json_to_rds_streaming(config, db_connection, s3_key, batch_size=None, table="employee_details", checkpoint=None,
+                               capture=None):
+    try:
+        # ✅ The body is consumed incrementally by the parser, never read whole
+        body = open_s3_object(config, s3_key)
+        total_rows = load_stream_to_rds(
+            config, db_connection, body, table=table, batch_size=batch_size, checkpoint=checkpoint, source_name=s3_key,
+            capture=capture,
+        )
+        body.close()
+        return total_rows
+
+    except Exception as e:
+        logger.error("❌ Exception occurred while streaming JSON from S3.")
+        logger.exception(e)
+        raise e
+
+def load_local_json_to_rds(config, db_connection, json_path, table="employee_details", checkpoint=None, capture=None):
+    try:
+        logger.info(f"📂 Loading JSON from local file: {json_path}")
+        if settings_from_config(config).load.streaming:
+            with open(json_path, "rb") as f:
+                return load_stream_to_rds(
+                    config, db_connection, f, table=table, checkpoint=checkpoint, source_name=json_path, capture=capture
+                )
+
+        frames = flatten_for_load(config, json_path)
+        return load_frames_to_rds(config, db_connection, frames, table=table, checkpoint=checkpoint, source=json_path, capture=capture)
+
+    except Exception as e:
+        logger.error(f"❌ Exception occurred while loading local JSON: {json_path}")
+        logger.exception(e)
+        raise e
+
+def build_stage(config, s3_key):
+    # ✅ Retries and backfills reuse a complete stage instead of re-parsing the JSON
+    _require_streamable(config, "Parquet staging")
+    uri = stage_uri_for(config, s3_key)
+    if stage_exists(config, uri):
+        logger.info(f"🧊 Reusing Parquet stage: {uri}")
+        return uri
+
+    body = open_s3_object(config, s3_key)
+    # ✅ Only valid rows are staged; shards and merges never see a quarantined row
+    validator = get_validator(config, source=s3_key)
+    roots = []
+    write_stage(config, validator.wrap(_verified_batches(body, get_batch_size(config), roots)), uri, roots=roots)
+    body.close()
+    return uri
+
+def load_stage_to_rds(config, db_connection, uri, table="employee_details", filters=None, checkpoint=None):
+    try:
+        logger.info(f"🧊 Loading Parquet stage {uri} (filters: {filters or 'none'})")
+        # ✅ Resume: committed row groups are skipped before they are read (ranged reads on S3)
+        resumed_rows = checkpoint.rows_committed(table) if checkpoint is not None else 0
+        batches = iter_stage_batches(config, uri, get_batch_size(config), filters=filters, skip_rows=resumed_rows)
+        stats = bulk_load_rows(config, db_connection, batches, table=table, checkpoint=checkpoint, resumed_rows=resumed_rows)
+        if stats["rows"] == 0:
+            logger.warning("⚠️ Parquet stage has no matching rows. Nothing loaded into RDS.")
+            return 0
+
+        logger.success(f"✅ Loaded {stats['rows']} staged rows into RDS.")
+        _log_row_count(table, stats["rows"])
+        return stats["rows"]
+
+    except Exception as e:
+        logger.error(f"❌ Exception occurred while loading Parquet stage: {uri}")
+        logger.exception(e)
+        raise e
+
+def feed_stage_changes(config, capture, uri, s3_key=None):
+    # ✅ Diffs the whole Parquet stage in one pass; loads may have skipped row groups on resume
+    logger.info(f"🔁 Capturing changes from Parquet stage {uri}")
+    capture.add_scopes(capture.spec.document_scope(root) for root in stage_roots(config, uri))
+    for batch in iter_stage_batches(config, uri, get_batch_size(config)):
+        capture.feed_rows(batch)
+    # The stage holds valid rows only; what build_stage quarantined is read back from the store
+    store = get_quarantine_store(config)
+    if store is not None and s3_key is not None:
+        capture.hold(store.keys(capture.spec, s3_key))
+
+def capture_stage_changes(config, uri, s3_key=None):
+    # Call after finish_load: the delta and hash index are published only for data that went live
+    capture = get_change_capture(config)
+    if capture is None:
+        return None
+    feed_stage_changes(config, capture, uri, s3_key=s3_key)
+    return capture.finish()
+
+def capture_object_changes(config, s3_key):
+    # Batch mode, after finish_load: pool workers cannot hand their diff back, so each loaded object is read again
+    capture = get_change_capture(config)
+    if capture is None:
+        return None
+    if staging_enabled(config):
+        feed_stage_changes(config, capture, stage_uri_for(config, s3_key), s3_key=s3_key)
+        return capture.finish()
+
+    # Filter only: the load already wrote these rows to the quarantine
+    validator = RowValidator(get_spec(config))
+    body = open_s3_object(config, s3_key)
+    if settings_from_config(config).load.streaming:
+        roots = []
+        for batch in _verified_batches(body, get_batch_size(config), roots):
+            capture.feed_rows(validator.filter_rows(batch))
+        capture.add_scopes(capture.spec.document_scope(root) for root in roots)
+    else:
+        payload = body.read()
+        if hasattr(body, "verify"):
+            body.verify()
+        frame = flatten_json_tables(payload, [get_spec(config)])[0]
+        capture.add_scopes([frame.attrs["document_scope"]])
+        capture.feed(validator.validate(frame))
+    body.close()
+    capture.hold(validator.quarantined_keys())
+    return capture.finish()
+
+def load_s3_object(config, db_connection, s3_key, table="employee_details", checkpoint=None, capture=None):
+    if staging_enabled(config):
+        uri = build_stage(config, s3_key)
+        rows = load_stage_to_rds(config, db_connection, uri, table=table, checkpoint=checkpoint)
+        if capture is not None:
+            feed_stage_changes(config, capture, uri, s3_key=s3_key)
+        return rows
+
+    # ✅ Streaming mode keeps memory flat for multi-GB exports
+    if settings_from_config(config).load.streaming:
+        return load_json_to_rds_streaming(config, db_connection, s3_key, table=table, checkpoint=checkpoint, capture=capture)
+    return load_json_to_rds(config, db_connection, s3_key, table=table, checkpoint=checkpoint, capture=capture)
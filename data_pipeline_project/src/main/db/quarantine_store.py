@@ -0,0 +1,85 @@
+import pandas as pd
+from sqlalchemy import text
+from loguru import logger
+
+from src.main.db.bulk_loader import _copy_buffer, is_postgres, rows_to_csv
+from src.main.utils.mapping_spec import get_spec
+from src.main.utils.resources import engine_from_config
+from src.main.utils.settings import settings_from_config
+from src.main.utils.validation import ParquetQuarantineStore, RowValidator, keys_frame, quarantine_columns
+
+class PostgresQuarantineStore:
+    """Quarantined rows in {table}_quarantine: every mapped column as TEXT, plus reason and source."""
+
+    def __init__(self, config):
+        self.config = config
+        self.schema = settings_from_config(config).database.schema
+        self.engine = engine_from_config(config)
+        self._ready = set()
+
+    def table(self, spec):
+        return f"{self.schema}.{spec.table}_quarantine"
+
+    def ensure_table(self, spec):
+        if spec.name in self._ready:
+            return
+        column_defs = ", ".join(f"{column} TEXT" for column in spec.columns)
+        statements = [
+            f"CREATE TABLE IF NOT EXISTS {self.table(spec)} ({column_defs}, reason TEXT NOT NULL, source TEXT, "
+            f"quarantined_at TIMESTAMPTZ NOT NULL DEFAULT now());",
+            f"CREATE INDEX IF NOT EXISTS {spec.table}_quarantine_source_idx ON {self.table(spec)} (source);",
+        ]
+        with self.engine.begin() as conn:
+            for statement in statements:
+                conn.execute(text(statement))
+        self._ready.add(spec.name)
+
+    def write(self, spec, rows, source):
+        self.ensure_table(spec)
+        columns = quarantine_columns(spec)
+        copy_sql = f"COPY {self.table(spec)} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+
+        # ✅ One transaction: a retried load replaces what it quarantined last time
+        raw_conn = self.engine.raw_connection()
+        try:
+            cursor = raw_conn.cursor()
+            cursor.execute(f"DELETE FROM {self.table(spec)} WHERE source = %(source)s;", {"source": source})
+            if len(rows):
+                _copy_buffer(cursor, copy_sql, rows_to_csv(rows.itertuples(index=False, name=None), columns))
+            raw_conn.commit()
+            cursor.close()
+        except Exception:
+            raw_conn.rollback()
+            raise
+        finally:
+            raw_conn.close()
+        if len(rows):
+            logger.info(f"🚧 Wrote {len(rows)} quarantined row(s) to {self.table(spec)}")
+
+    def keys(self, spec, source):
+        self.ensure_table(spec)
+        with self.engine.connect() as conn:
+            frame = pd.read_sql(
+                text(f"SELECT DISTINCT {', '.join(spec.key)} FROM {self.table(spec)} WHERE source = :source"),
+                conn, params={"source": source},
+            )
+        return keys_frame(frame, spec)
+
+def get_quarantine_store(config):
+    validation = settings_from_config(config).validation
+    if validation.quarantine == "parquet":
+        return ParquetQuarantineStore(config, validation.uri)
+    if validation.quarantine == "postgres":
+        if is_postgres(config):
+            return PostgresQuarantineStore(config)
+        logger.warning("⚠️ [validation] quarantine = postgres needs PostgreSQL; invalid rows are dropped, not kept.")
+    return None
+
+def get_validator(config, spec=None, source=None):
+    # ✅ Always on: rows with extraction sentinels must never reach COPY, quarantine storage or not
+    return RowValidator(
+        spec or get_spec(config),
+        get_quarantine_store(config),
+        source=source,
+        max_invalid_ratio=settings_from_config(config).validation.max_invalid_ratio,
+    )
@@ -1,7 +1,14 @@
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 from sqlalchemy.orm import sessionmaker
 from loguru import logger
 
+from src.main.utils.resources import engine_from_config
+from src.main.utils.settings import settings_from_config
+
+def build_connection_string(config):
+    # ✅ Built once per config by the settings object (search_path set in the options)
+    return settings_from_config(config).database.dsn
+
 class PostgresConnection:
     def __init__(self, config):
         self.config = config
@@ -10,23 +17,12 @@ class PostgresConnection:
 
     def connect(self):
         try:
-            db_config = self.config["database"]
-            user = db_config["user"]
-            password = db_config["password"]
-            host = db_config["host"]
-            port = db_config["port"]
-            database = db_config["database"]
-            db_type = db_config.get("db_type", "postgresql")
-            schema = db_config.get("schema", "public")
-
-            # ✅ Set search_path using options in connection string
-            connection_string = (
-                f"{db_type}://{user}:{password}@{host}:{port}/{database}"
-                f"?options=-csearch_path={schema}"
-            )
-
-            # ✅ Create engine
-            self.engine = create_engine(connection_string)
+            db_settings = settings_from_config(self.config).database
+            database = db_settings.database
+            schema = db_settings.schema
+
+            # ✅ Borrow the process-wide pooled engine for this DSN
+            self.engine = engine_from_config(self.config)
             logger.info(f"✅ PostgreSQL connection established to '{database}' with schema '{schema}'")
 
             # ✅ Confirm schema is set by checking search_path
@@ -46,6 +42,10 @@ class PostgresConnection:
         return self.engine
 
     def close(self):
+        # ✅ The engine is shared per process; only release this object's session
+        if self.session:
+            self.session.close()
+            self.session = None
         if self.engine:
-            self.engine.dispose()
-            logger.info("🔒 Engine connection closed.")
+            self.engine = None
+            logger.info("🔒 Session closed; engine returned to the shared pool.")
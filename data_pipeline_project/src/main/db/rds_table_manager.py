@@ -1,9 +1,37 @@
 from sqlalchemy import text
 from loguru import logger
 
+from src.main.db.bulk_loader import is_postgres
+from src.main.utils.mapping_spec import EMPLOYEE_SPEC, get_spec, normalize_enabled
+from src.main.utils.metrics import track_stage
+from src.main.utils.settings import settings_from_config
+
+EMPLOYEE_TABLE = EMPLOYEE_SPEC.table
+INCOMING_TABLE = f"{EMPLOYEE_TABLE}__incoming"
+EMPLOYEE_KEY_COLUMNS = EMPLOYEE_SPEC.key
+
+def load_target(spec, write_mode="replace"):
+    # ✅ upsert loads land in a per-table copy that finish_load merges,
+    # swap loads in a shadow table that finish_load renames into place
+    if write_mode == "upsert":
+        return f"{spec.table}__incoming"
+    if write_mode == "swap":
+        return f"{spec.table}__staging"
+    return spec.table
+
+def previous_table(spec):
+    return f"{spec.table}__previous"
+
 class RDSTableManager:
-    def __init__(self, connection):
+    def __init__(self, connection, spec=None):
         self.connection = connection
+        # ✅ Columns, types, table name and key all come from the mapping spec
+        self.spec = spec or get_spec(connection.config)
+        self.table = self.spec.table
+        self.incoming_table = load_target(self.spec, "upsert")
+        self.children = self.spec.children if normalize_enabled(connection.config) else []
+        # ✅ Set by prepare_load(resume=True): keep checkpointed rows instead of recreating load targets
+        self.keep_existing = False
 
     def create_employee_table(self):
         session = None
@@ -13,39 +41,31 @@ class RDSTableManager:
                 self.connection.connect()
 
             # ✅ Fetch schema from config
-            schema = self.connection.config["database"].get("schema", "public")
+            schema = self._schema()
 
             # ✅ Ensure session is active
             Session = self.connection.Session
             session = Session()
 
-            # ✅ Explicitly qualify schema in table creation
-            drop_table_sql = f"DROP TABLE IF EXISTS {schema}.employee_details;"
-            create_table_sql = f"""
-            CREATE TABLE {schema}.employee_details (
-                company TEXT,
-                location TEXT,
-                department TEXT,
-                employee_id TEXT,
-                name TEXT,
-                role TEXT,
-                skills TEXT,
-                campaigns TEXT
-            );
-            """
-
-            logger.info(f"🧹 Dropping existing table: {schema}.employee_details")
-            session.execute(text(drop_table_sql))
-            session.commit()
+            # ✅ Explicitly qualify schema in table creation; DDL generated from the mapping spec
+            drop_table_sql = f"DROP TABLE IF EXISTS {schema}.{self.table};"
+            create_table_sql = self.spec.create_table_sql(schema, if_not_exists=self.keep_existing)
+
+            if self.keep_existing:
+                logger.info(f"⏩ Keeping {schema}.{self.table}: resuming a checkpointed load")
+            else:
+                logger.info(f"🧹 Dropping existing table: {schema}.{self.table}")
+                session.execute(text(drop_table_sql))
+                session.commit()
 
-            logger.info(f"🛠 Creating table: {schema}.employee_details")
+            logger.info(f"🛠 Creating table: {schema}.{self.table}")
             session.execute(text(create_table_sql))
             session.commit()
 
-            logger.info(f"✅ Table '{schema}.employee_details' created successfully.")
+            logger.info(f"✅ Table '{schema}.{self.table}' created successfully.")
 
         except Exception as e:
-            logger.error(f"❌ Error creating table '{schema}.employee_details': {e}")
+            logger.error(f"❌ Error creating table '{schema}.{self.table}': {e}")
             if session:
                 session.rollback()
 
@@ -53,3 +73,316 @@ class RDSTableManager:
             if session:
                 session.close()
                 logger.info("🔒 Session closed after table creation.")
+
+    def prepare_load(self, write_mode="replace", resume=False):
+        # ✅ upsert: load into a staging table, then merge only changed rows
+        self.keep_existing = resume
+        with track_stage("create_table"):
+            if write_mode == "upsert":
+                self.ensure_employee_table()
+                self.ensure_child_tables()
+                if settings_from_config(self.connection.config).load.defer_indexes:
+                    self.drop_indexes()
+                return self.create_staging_table()
+
+            if write_mode == "swap":
+                # ✅ Readers keep the live table; the load fills a shadow copy
+                return self.create_shadow_tables()
+
+            # ✅ Fresh tables carry no secondary indexes until finish_load
+            self.create_employee_table()
+            self.create_child_tables()
+            return self.table
+
+    def finish_load(self, write_mode="replace", checkpoints=None):
+        if write_mode == "swap":
+            # ✅ Index and analyze the shadow while nobody reads it, then rename it into place.
+            # Checkpoints are cleared in the swap transaction: a shadow that went live is never resumed into.
+            self.build_indexes(write_mode="swap")
+            self.analyze_tables(write_mode="swap")
+            clear_sql = [checkpoints.clear_sql(self.load_targets("swap"))] if checkpoints is not None else []
+            self.swap_shadow_tables(extra_statements=clear_sql)
+            self.log_row_estimates()
+            return None
+
+        changed = None
+        if write_mode == "upsert":
+            # Children first: their merge reads the parent keys from the parent's staging table, which merge_staging drops
+            self.merge_child_staging()
+            changed = self.merge_staging()
+
+        # ✅ Indexes are built once, after the bulk load, instead of maintained row by row.
+        # A live upsert table keeps taking writes, so it is indexed CONCURRENTLY.
+        self.build_indexes(concurrently=write_mode == "upsert")
+        self.analyze_tables()
+        self.log_row_estimates()
+        if checkpoints is not None:
+            checkpoints.clear(self.load_targets(write_mode))
+        return changed
+
+    def load_targets(self, write_mode="replace"):
+        return [load_target(spec, write_mode) for spec in self._indexed_specs()]
+
+    def _recreate_sql(self, spec, schema, table=None, unlogged=False):
+        table = table or spec.table
+        if self.keep_existing:
+            return [spec.create_table_sql(schema, table=table, unlogged=unlogged, if_not_exists=True)]
+        return [f"DROP TABLE IF EXISTS {schema}.{table};", spec.create_table_sql(schema, table=table, unlogged=unlogged)]
+
+    def _schema(self):
+        if not self.connection.engine:
+            self.connection.connect()
+        return settings_from_config(self.connection.config).database.schema
+
+    def _postgres(self):
+        return is_postgres(self.connection.config)
+
+    def _indexed_specs(self):
+        return [self.spec] + self.children
+
+    @staticmethod
+    def _live_or_shadow(spec, write_mode):
+        return load_target(spec, "swap") if write_mode == "swap" else spec.table
+
+    def _run_statements(self, statements, action):
+        # An empty list (e.g. drop_indexes on a spec without indexes) must not leave result unbound
+        result = None
+        session = self.connection.Session()
+        try:
+            for statement in statements:
+                result = session.execute(text(statement))
+            session.commit()
+            return result
+        except Exception as e:
+            logger.error(f"❌ Error while trying to {action}: {e}")
+            session.rollback()
+            raise
+        finally:
+            session.close()
+
+    def ensure_employee_table(self):
+        schema = self._schema()
+        key_columns = ", ".join(self.spec.key)
+
+        # ✅ Keep existing rows; only add what incremental loads need
+        statements = [
+            self.spec.create_table_sql(schema, if_not_exists=True, extra_columns=["row_hash TEXT"]),
+            f"ALTER TABLE {schema}.{self.table} ADD COLUMN IF NOT EXISTS row_hash TEXT;",
+            f"CREATE UNIQUE INDEX IF NOT EXISTS {self.table}_key_idx ON {schema}.{self.table} ({key_columns});",
+        ]
+
+        logger.info(f"🛠 Ensuring table {schema}.{self.table} with key ({key_columns})")
+        self._run_statements(statements, f"prepare '{schema}.{self.table}' for upserts")
+        logger.info(f"✅ Table '{schema}.{self.table}' ready for incremental loads.")
+
+    def create_staging_table(self):
+        schema = self._schema()
+
+        # ✅ UNLOGGED: the staging copy is rebuilt each run, so skip WAL
+        statements = self._recreate_sql(self.spec, schema, table=self.incoming_table, unlogged=True)
+
+        logger.info(f"🛠 Creating staging table: {schema}.{self.incoming_table}")
+        self._run_statements(statements, f"create '{schema}.{self.incoming_table}'")
+        return self.incoming_table
+
+    def merge_staging(self):
+        schema = self._schema()
+        columns = ", ".join(self.spec.columns)
+        key_columns = ", ".join(self.spec.key)
+        update_columns = [col for col in self.spec.columns if col not in self.spec.key] + ["row_hash"]
+        assignments = ", ".join(f"{col} = EXCLUDED.{col}" for col in update_columns)
+
+        # ✅ ROW(...)::text keeps NULL and '' distinct in the hash
+        # ✅ DISTINCT ON: ON CONFLICT cannot touch the same key twice in one statement
+        merge_sql = f"""
+        INSERT INTO {schema}.{self.table} ({columns}, row_hash)
+        SELECT DISTINCT ON ({key_columns})
+            {columns}, md5(ROW({columns})::text)
+        FROM {schema}.{self.incoming_table}
+        ORDER BY {key_columns}
+        ON CONFLICT ({key_columns}) DO UPDATE
+        SET {assignments}
+        WHERE {self.table}.row_hash IS DISTINCT FROM EXCLUDED.row_hash;
+        """
+
+        logger.info(f"🔀 Merging {schema}.{self.incoming_table} into {schema}.{self.table}")
+        result = self._run_statements([merge_sql], f"merge into '{schema}.{self.table}'")
+        changed = result.rowcount
+        logger.success(f"✅ Upsert complete: {changed} rows inserted or changed.")
+
+        self._run_statements([f"DROP TABLE IF EXISTS {schema}.{self.incoming_table};"], f"drop '{schema}.{self.incoming_table}'")
+        return changed
+
+    def create_child_tables(self):
+        if not self.children:
+            return
+        schema = self._schema()
+        statements = []
+        for child in self.children:
+            statements.extend(self._recreate_sql(child, schema))
+
+        logger.info(f"🛠 Creating child tables: {[child.table for child in self.children]}")
+        self._run_statements(statements, "create child tables")
+
+    def ensure_child_tables(self):
+        if not self.children:
+            return
+        schema = self._schema()
+        statements = []
+        for child in self.children:
+            statements.append(child.create_table_sql(schema, if_not_exists=True))
+            statements.extend(self._recreate_sql(child, schema, table=load_target(child, "upsert"), unlogged=True))
+
+        logger.info(f"🛠 Ensuring child tables and their staging copies: {[child.table for child in self.children]}")
+        self._run_statements(statements, "prepare child tables for upserts")
+
+    def merge_child_staging(self):
+        if not self.children:
+            return
+        schema = self._schema()
+        statements = []
+        for child in self.children:
+            incoming = load_target(child, "upsert")
+            columns = ", ".join(child.columns)
+            key_columns = ", ".join(child.key)
+            # ✅ Replace the child rows of every parent present in this load, in one transaction.
+            # Parents come from the parent staging table: one whose list became empty has no incoming child rows.
+            statements.append(
+                f"DELETE FROM {schema}.{child.table} WHERE ({key_columns}) IN "
+                f"(SELECT DISTINCT {key_columns} FROM {schema}.{self.incoming_table});"
+            )
+            statements.append(f"INSERT INTO {schema}.{child.table} ({columns}) SELECT {columns} FROM {schema}.{incoming};")
+            statements.append(f"DROP TABLE IF EXISTS {schema}.{incoming};")
+
+        logger.info(f"🔀 Merging child tables: {[child.table for child in self.children]}")
+        self._run_statements(statements, "merge child tables")
+
+    def drop_indexes(self):
+        # ✅ Secondary indexes only; the unique key index backs ON CONFLICT and always stays
+        schema = self._schema()
+        statements = [
+            f"DROP INDEX IF EXISTS {schema}.{spec.index_name(columns)};"
+            for spec in self._indexed_specs()
+            for columns in spec.indexes
+        ]
+        logger.info(f"🧹 Dropping {len(statements)} secondary indexes before the bulk load")
+        self._run_statements(statements, "drop secondary indexes")
+
+    def build_indexes(self, concurrently=False, write_mode="replace"):
+        schema = self._schema()
+        concurrently = concurrently and self._postgres()
+        indexes = [(spec, columns) for spec in self._indexed_specs() for columns in spec.indexes]
+        if not indexes:
+            return
+
+        with track_stage("build_indexes"):
+            logger.info(f"🗂 Building {len(indexes)} indexes{' concurrently' if concurrently else ''}")
+            if not concurrently:
+                statements = [
+                    sql
+                    for spec in self._indexed_specs()
+                    for sql in spec.create_index_sql(schema, table=self._live_or_shadow(spec, write_mode))
+                ]
+                self._run_statements(statements, "build indexes")
+                return
+
+            # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+            with self.connection.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+                for spec, columns in indexes:
+                    name = spec.index_name(columns)
+                    try:
+                        conn.execute(text(
+                            f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {schema}.{spec.table} ({', '.join(columns)});"
+                        ))
+                    except Exception as e:
+                        # ✅ A failed concurrent build leaves an INVALID index that IF NOT EXISTS would keep skipping
+                        logger.error(f"❌ Error while building index {name}: {e}")
+                        conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {schema}.{name};"))
+                        raise
+
+    def analyze_tables(self, write_mode="replace"):
+        if not self._postgres():
+            return
+        schema = self._schema()
+        tables = [self._live_or_shadow(spec, write_mode) for spec in self._indexed_specs()]
+
+        # ✅ Fresh planner statistics (and pg_class.reltuples) right after the bulk load
+        with track_stage("analyze"):
+            logger.info(f"📈 Running ANALYZE on {tables}")
+            self._run_statements([f"ANALYZE {schema}.{table};" for table in tables], "analyze loaded tables")
+
+    def approximate_row_count(self, table=None):
+        # ✅ Planner estimate from pg_class instead of a full COUNT(*) scan
+        schema = self._schema()
+        with self.connection.engine.connect() as conn:
+            result = conn.execute(
+                text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:name)"),
+                {"name": f"{schema}.{table or self.table}"},
+            )
+            return result.scalar()
+
+    def log_row_estimates(self):
+        if not self._postgres():
+            return
+        for spec in self._indexed_specs():
+            logger.info(f"📊 Approximate row count in '{spec.table}': {self.approximate_row_count(spec.table)}")
+
+    def create_shadow_tables(self):
+        schema = self._schema()
+        statements = []
+        for spec in self._indexed_specs():
+            shadow = load_target(spec, "swap")
+            # A shadow left over from a failed run is rebuilt, unless a checkpointed load resumes into it
+            statements.extend(self._recreate_sql(spec, schema, table=shadow))
+
+        logger.info(f"🛠 Creating shadow tables: {[load_target(spec, 'swap') for spec in self._indexed_specs()]}")
+        self._run_statements(statements, "create shadow tables")
+        return load_target(self.spec, "swap")
+
+    def _rename_sql(self, spec, schema, source, target, if_exists=False):
+        # Index names are schema-wide, so they move with their table
+        statements = [f"ALTER TABLE {'IF EXISTS ' if if_exists else ''}{schema}.{source} RENAME TO {target};"]
+        statements += [
+            f"ALTER INDEX IF EXISTS {schema}.{spec.index_name(columns, source)} RENAME TO {spec.index_name(columns, target)};"
+            for columns in spec.indexes
+        ]
+        statements.append(f"ALTER INDEX IF EXISTS {schema}.{source}_key_idx RENAME TO {target}_key_idx;")
+        return statements
+
+    def _swap_statements(self, renames):
+        lock_timeout = settings_from_config(self.connection.config).load.swap_lock_timeout
+        # ✅ Fail fast instead of queueing behind a long read (and blocking every reader behind us)
+        statements = [f"SET LOCAL lock_timeout = '{lock_timeout}';"] if self._postgres() else []
+        for spec, source, target, if_exists in renames:
+            statements += self._rename_sql(spec, self._schema(), source, target, if_exists)
+        return statements
+
+    def swap_shadow_tables(self, extra_statements=()):
+        schema = self._schema()
+        specs = self._indexed_specs()
+
+        # The previous snapshot is dropped outside the swap, so the swap itself only renames
+        self._run_statements([f"DROP TABLE IF EXISTS {schema}.{previous_table(spec)};" for spec in specs], "drop previous tables")
+
+        renames = []
+        for spec in specs:
+            renames.append((spec, spec.table, previous_table(spec), True))
+            renames.append((spec, load_target(spec, "swap"), spec.table, False))
+
+        # ✅ One short transaction: readers see the old table or the new one, never an empty one
+        with track_stage("swap_tables"):
+            self._run_statements(self._swap_statements(renames) + list(extra_statements), "swap shadow tables into place")
+        logger.success(f"🔁 Swapped in {[spec.table for spec in specs]}; previous data kept as *__previous.")
+
+    def restore_previous(self):
+        # ✅ Rollback: exchange the live tables with the kept *__previous copies
+        specs = self._indexed_specs()
+        renames = []
+        for spec in specs:
+            parked = f"{spec.table}__rollback"
+            renames.append((spec, spec.table, parked, False))
+            renames.append((spec, previous_table(spec), spec.table, False))
+            renames.append((spec, parked, previous_table(spec), False))
+
+        self._run_statements(self._swap_statements(renames), "restore previous tables")
+        logger.success(f"⏪ Restored previous {[spec.table for spec in specs]}.")
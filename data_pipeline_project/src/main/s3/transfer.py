@@ -0,0 +1,173 @@
+import gzip
+import hashlib
+import shutil
+import tempfile
+import time
+
+from boto3.s3.transfer import TransferConfig
+from loguru import logger
+
+from src.main.utils.settings import settings_from_config
+
+try:
+    import zstandard
+except ImportError:  # gzip-only without the zstandard package
+    zstandard = None
+
+MB = 1024 * 1024
+HASH_CHUNK_SIZE = 8 * MB
+CHECKSUM_METADATA_KEY = "sha256"
+RAW_SIZE_METADATA_KEY = "raw-size"
+
+# Content-Encoding value -> key suffix
+COMPRESSION_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+
+def build_transfer_config(config):
+    # ✅ Same knobs drive multipart uploads and ranged downloads
+    return TransferConfig(**settings_from_config(config).aws.transfer_kwargs, use_threads=True)
+
+def get_compression(config):
+    # The value itself is validated by the settings object
+    compression = settings_from_config(config).aws.compression
+    if compression == "zstd" and zstandard is None:
+        raise ImportError("❌ [aws] compression = zstd needs the zstandard package")
+    return compression
+
+def compress_to_tempfile(local_path, compression, level=None):
+    # ✅ Chunked: the source file is never held in memory, compressed or not
+    tmp = tempfile.TemporaryFile()
+    with open(local_path, "rb") as src:
+        if compression == "gzip":
+            with gzip.GzipFile(fileobj=tmp, mode="wb", compresslevel=level or 6, mtime=0) as dst:
+                shutil.copyfileobj(src, dst, HASH_CHUNK_SIZE)
+        else:
+            compressor = zstandard.ZstdCompressor(level=level or 3, threads=-1)
+            compressor.copy_stream(src, tmp, read_size=HASH_CHUNK_SIZE)
+    tmp.seek(0)
+    return tmp
+
+def content_encoding(head, key):
+    # ContentEncoding wins; the key suffix covers objects uploaded without the header
+    encoding = (head.get("ContentEncoding") or "").lower()
+    if encoding in COMPRESSION_SUFFIXES:
+        return encoding
+    for name, suffix in COMPRESSION_SUFFIXES.items():
+        if key.endswith(suffix):
+            return name
+    return None
+
+class DecompressingReader:
+    """Streaming gzip/zstd decoder over a (checksummed) object body."""
+
+    def __init__(self, raw, encoding, key):
+        self.raw = raw
+        self.encoding = encoding
+        self.key = key
+        if encoding == "gzip":
+            self._decoded = gzip.GzipFile(fileobj=raw, mode="rb")
+        else:
+            if zstandard is None:
+                raise ImportError(f"❌ {key} is zstd-encoded; install the zstandard package to read it")
+            self._decoded = zstandard.ZstdDecompressor().stream_reader(raw, read_across_frames=True)
+        self._size = 0
+
+    def read(self, size=-1):
+        chunk = self._decoded.read(size)
+        self._size += len(chunk)
+        return chunk
+
+    @property
+    def bytes_read(self):
+        # Wire bytes: what the transfer actually cost
+        return getattr(self.raw, "bytes_read", None)
+
+    @property
+    def decoded_bytes(self):
+        return self._size
+
+    def verify(self):
+        # ✅ The stored checksum covers the compressed object, so verification stays on the raw reader
+        if hasattr(self.raw, "verify"):
+            self.raw.verify()
+        compressed = self.bytes_read
+        if compressed:
+            logger.info(f"🗜️ Decoded {self.encoding} {self.key}: {compressed} -> {self._size} bytes ({self._size / compressed:.1f}x)")
+
+    def close(self):
+        self._decoded.close()
+        self.raw.close()
+
+def file_sha256(fileobj):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_SIZE), b""):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+def path_sha256(path):
+    with open(path, "rb") as f:
+        return file_sha256(f)
+
+def expected_object_checksum(head):
+    return head.get("Metadata", {}).get(CHECKSUM_METADATA_KEY)
+
+def _verify(key, expected_sha256, expected_size, actual_sha256, actual_size):
+    if expected_size is not None and actual_size != expected_size:
+        raise ValueError(f"❌ Size mismatch for {key}: expected {expected_size} bytes, got {actual_size}")
+    if expected_sha256 and actual_sha256 != expected_sha256:
+        raise ValueError(f"❌ Checksum mismatch for {key}: expected {expected_sha256}, got {actual_sha256}")
+
+class ChecksumReader:
+    """File-like wrapper that hashes bytes as they are read and verifies them at EOF."""
+
+    def __init__(self, raw, key, expected_sha256=None, expected_size=None):
+        self.raw = raw
+        self.key = key
+        self.expected_sha256 = expected_sha256
+        self.expected_size = expected_size
+        self._digest = hashlib.sha256()
+        self._size = 0
+        self._verified = False
+
+    def read(self, size=-1):
+        chunk = self.raw.read(size)
+        if chunk:
+            self._digest.update(chunk)
+            self._size += len(chunk)
+        elif size != 0:
+            self.verify()
+        return chunk
+
+    @property
+    def bytes_read(self):
+        return self._size
+
+    def verify(self):
+        if self._verified:
+            return
+        # ✅ Drain anything the parser did not need so the digest covers the whole object
+        for chunk in iter(lambda: self.raw.read(HASH_CHUNK_SIZE), b""):
+            self._digest.update(chunk)
+            self._size += len(chunk)
+        _verify(self.key, self.expected_sha256, self.expected_size, self._digest.hexdigest(), self._size)
+        self._verified = True
+        logger.info(f"🔐 Verified {self._size} bytes of {self.key}")
+
+    def close(self):
+        self.raw.close()
+
+def download_to_tempfile(s3, bucket, key, transfer_config, head=None):
+    head = head or s3.head_object(Bucket=bucket, Key=key)
+    size = head["ContentLength"]
+
+    # ✅ download_fileobj issues concurrent ranged GETs above multipart_threshold
+    tmp = tempfile.TemporaryFile()
+    started = time.perf_counter()
+    s3.download_fileobj(bucket, key, tmp, Config=transfer_config)
+    elapsed = time.perf_counter() - started
+    logger.info(f"📥 Downloaded {size / MB:.1f} MB in {elapsed:.2f}s ({size / MB / max(elapsed, 1e-9):.1f} MB/s)")
+
+    tmp.seek(0)
+    _verify(key, expected_object_checksum(head), size, file_sha256(tmp), tmp.tell())
+    logger.info(f"🔐 Verified {size} bytes of {key}")
+    tmp.seek(0)
+    return tmp
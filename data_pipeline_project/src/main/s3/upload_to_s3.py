@@ -1,44 +1,137 @@
-from configparser import ConfigParser
-import boto3
 import os
 from loguru import logger
 from datetime import datetime
 
+from src.main.s3.transfer import CHECKSUM_METADATA_KEY, COMPRESSION_SUFFIXES, MB, RAW_SIZE_METADATA_KEY, build_transfer_config
+from src.main.s3.transfer import compress_to_tempfile, file_sha256, get_compression, path_sha256
+from src.main.utils.metrics import track_stage
+from src.main.utils.resources import get_s3_client
+from src.main.utils.settings import settings_from_config
+
 
 class S3Uploader:
-    def __init__(self, aws_access_key_id, aws_secret_access_key, region_name, bucket_name):
+    def __init__(self, aws_access_key_id, aws_secret_access_key, region_name, bucket_name, transfer_config=None,
+                 endpoint_url=None):
         self.bucket_name = bucket_name
-        self.s3 = boto3.client(
-            "s3",
+        self.transfer_config = transfer_config
+        # ✅ Shared, cached client (one per credential set, region and endpoint)
+        self.s3 = get_s3_client(
             aws_access_key_id=aws_access_key_id,
             aws_secret_access_key=aws_secret_access_key,
-            region_name=region_name
+            region_name=region_name,
+            endpoint_url=endpoint_url
         )
 
-    def upload_file(self, local_path, s3_key):
+    def upload_file(self, local_path, s3_key, compression=None, level=None):
         try:
-            self.s3.upload_file(local_path, self.bucket_name, s3_key)
+            size = os.path.getsize(local_path)
+            if compression:
+                return self._upload_compressed(local_path, s3_key, size, compression, level)
+
+            # ✅ Store the content checksum so the load path can reject partial transfers
+            checksum = path_sha256(local_path)
+            with track_stage("s3_upload") as stage:
+                stage.bytes = size
+                self.s3.upload_file(
+                    local_path,
+                    self.bucket_name,
+                    s3_key,
+                    ExtraArgs={"Metadata": {CHECKSUM_METADATA_KEY: checksum}},
+                    Config=self.transfer_config
+                )
+
+            self._check_size(s3_key, size)
             logger.info(f"✅ File uploaded to S3: s3://{self.bucket_name}/{s3_key}")
         except Exception as e:
             logger.error(f"❌ Failed to upload file to S3: {e}")
             raise
 
-def upload_file(config):
-    # 🗂️ Read local JSON file path from config
-    json_path = config["local"]["json_file_path"]
+    def _upload_compressed(self, local_path, s3_key, size, compression, level):
+        with track_stage("s3_compress") as compress_stage:
+            tmp = compress_to_tempfile(local_path, compression, level)
+            compressed_size = compress_stage.bytes = tmp.seek(0, 2)
+            tmp.seek(0)
+            # ✅ The checksum covers the stored (compressed) bytes, matching ContentLength on read
+            checksum = file_sha256(tmp)
+            tmp.seek(0)
+        compress_s = compress_stage.duration_s
+
+        with tmp:
+            with track_stage("s3_upload") as stage:
+                stage.bytes = compressed_size
+                self.s3.upload_fileobj(
+                    tmp,
+                    self.bucket_name,
+                    s3_key,
+                    ExtraArgs={
+                        "ContentEncoding": compression,
+                        "ContentType": "application/json",
+                        "Metadata": {CHECKSUM_METADATA_KEY: checksum, RAW_SIZE_METADATA_KEY: str(size)},
+                    },
+                    Config=self.transfer_config
+                )
+        upload_s = stage.duration_s
+
+        self._check_size(s3_key, compressed_size)
+        # Time the raw file would have taken at the throughput this upload achieved
+        ratio = size / max(compressed_size, 1)
+        saved_s = upload_s * (ratio - 1) - compress_s
+        logger.info(
+            f"🗜️ {compression}: {size / MB:.1f} MB -> {compressed_size / MB:.1f} MB ({ratio:.1f}x) "
+            f"in {compress_s:.2f}s; upload {upload_s:.2f}s, ~{saved_s:.2f}s saved vs raw"
+        )
+        logger.info(f"✅ File uploaded to S3: s3://{self.bucket_name}/{s3_key}")
+        return {"raw_bytes": size, "compressed_bytes": compressed_size, "ratio": ratio, "compress_seconds": compress_s, "upload_seconds": upload_s}
+
+    def _check_size(self, s3_key, size):
+        head = self.s3.head_object(Bucket=self.bucket_name, Key=s3_key)
+        if head["ContentLength"] != size:
+            raise ValueError(f"❌ Uploaded size {head['ContentLength']} does not match local size {size}")
+
+    def object_exists(self, s3_key):
+        try:
+            self.s3.head_object(Bucket=self.bucket_name, Key=s3_key)
+            return True
+        except self.s3.exceptions.ClientError:
+            return False
+
+def get_uploader(config):
+    aws = settings_from_config(config).aws
+    return S3Uploader(
+        aws_access_key_id=aws.aws_access_key_id,
+        aws_secret_access_key=aws.aws_secret_access_key,
+        region_name=aws.region_name,
+        bucket_name=aws.bucket_name,
+        transfer_config=build_transfer_config(config),
+        # Same endpoint as the download client (MinIO, LocalStack)
+        endpoint_url=aws.endpoint_url
+    )
 
+def upload_local_file(config, json_path, file_stem="data"):
     # 🕒 Create S3 key with timestamp
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    s3_key_prefix = config["aws"].get("s3_key_prefix", "")
-    s3_key = os.path.join(s3_key_prefix, f"data_{timestamp}.json")
-
-    # ☁️ Upload file
-    uploader = S3Uploader(
-        aws_access_key_id=config["aws"]["aws_access_key_id"],
-        aws_secret_access_key=config["aws"]["aws_secret_access_key"],
-        region_name=config["aws"]["region_name"],
-        bucket_name=config["aws"]["bucket_name"]
-    )
-    uploader.upload_file(json_path, s3_key)
+    aws = settings_from_config(config).aws
+    s3_key_prefix = aws.s3_key_prefix
+    compression = get_compression(config)
+    suffix = COMPRESSION_SUFFIXES[compression] if compression else ""
+    s3_key = os.path.join(s3_key_prefix, f"{file_stem}_{timestamp}.json{suffix}")
+
+    # ☁️ Upload file (gzip/zstd-encoded when [aws] compression is set)
+    uploader = get_uploader(config)
+    uploader.upload_file(json_path, s3_key, compression=compression, level=aws.compression_level)
+
+    return s3_key
+
+def upload_file(config):
+    # ♻️ Reuse an object that is already in S3 instead of uploading again
+    existing_key = settings_from_config(config).aws.existing_s3_key
+    if existing_key:
+        if not get_uploader(config).object_exists(existing_key):
+            raise FileNotFoundError(f"❌ existing_s3_key not found in S3: {existing_key}")
+        logger.info(f"♻️ Reusing existing S3 object: {existing_key}")
+        return existing_key
+
+    # 🗂️ Read local JSON file path from config
+    json_path = settings_from_config(config).json_file_path
 
-    return s3_key  # ✅ Return the key for XCom
+    return upload_local_file(config, json_path)  # ✅ Return the key for XCom
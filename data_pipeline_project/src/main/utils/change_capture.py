@@ -0,0 +1,176 @@
+import uuid
+from datetime import datetime, timezone
+from urllib.parse import quote
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+from loguru import logger
+
+from src.main.utils.metrics import track_stage
+from src.main.utils.parquet_stage import _filesystem
+
+INSERT, UPDATE, DELETE = "insert", "update", "delete"
+
+def new_run_id():
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%fZ")
+
+def row_hashes(df, spec):
+    # ✅ Vectorised 64-bit hash over every mapped column; None and "" hash differently.
+    # Object dtype first, so the same values hash the same from a DataFrame, COPY batches or Parquet.
+    hashes = pd.util.hash_pandas_object(df[spec.columns].astype(object), index=False)
+    return hashes.to_numpy().view("int64")
+
+def change_columns(spec):
+    return ["change_type"] + spec.columns + ["row_hash"]
+
+def _key_index(df, key):
+    return pd.MultiIndex.from_frame(df[key].astype(object))
+
+class ChangeCapture:
+    """Diffs one snapshot, fed in batches, against the previous per-row hash index."""
+
+    def __init__(self, spec, store, run_id=None):
+        self.spec = spec
+        self.store = store
+        self.run_id = run_id or new_run_id()
+        self.key = spec.key
+        self._previous = pd.Series(dtype="int64", index=pd.MultiIndex.from_tuples([], names=self.key))
+        self._scopes = set()
+        self._changes = []
+        self._index = []
+        self._held = []
+        self.counts = {INSERT: 0, UPDATE: 0, DELETE: 0}
+
+    def _load_scopes(self, df):
+        scope_cols = self.spec.document_key
+        self.add_scopes(set(df[scope_cols].drop_duplicates().itertuples(index=False, name=None)) if scope_cols else {()})
+
+    def add_scopes(self, scopes):
+        # ✅ Scopes come from the document root (the companies in the file), not only the surviving rows:
+        # a company emptied to zero employees, or an empty snapshot, still gets its deletes.
+        # Previous hashes are loaded per scope the first time it shows up.
+        new_scopes = set(scopes) - self._scopes
+        if not new_scopes:
+            return
+        self._scopes |= new_scopes
+        previous = self.store.previous_index(self.spec, sorted(new_scopes, key=str))
+        if len(previous):
+            loaded = pd.Series(previous["row_hash"].to_numpy(dtype="int64"), index=_key_index(previous, self.key))
+            self._previous = pd.concat([self._previous, loaded]) if len(self._previous) else loaded
+
+    def feed(self, df):
+        if df.empty:
+            return
+        self._load_scopes(df)
+
+        current = df[self.spec.columns].copy()
+        current["row_hash"] = row_hashes(current, self.spec)
+        self._index.append(current[self.key + ["row_hash"]])
+
+        # ✅ Hash-table lookup of this batch's keys only: O(batch), not O(snapshot).
+        # get_indexer instead of reindex: missing keys would turn the int64 hashes into lossy floats.
+        positions = self._previous.index.get_indexer(_key_index(current, self.key))
+        is_new = positions == -1
+        previous = self._previous.to_numpy()[positions] if len(self._previous) else positions
+        is_changed = ~is_new & (previous != current["row_hash"].to_numpy())
+
+        for change_type, mask in ((INSERT, is_new), (UPDATE, is_changed)):
+            if mask.any():
+                self._changes.append(current[mask].assign(change_type=change_type))
+                self.counts[change_type] += int(mask.sum())
+
+    def feed_rows(self, rows):
+        self.feed(pd.DataFrame(rows, columns=self.spec.columns))
+
+    def hold(self, keys):
+        # Quarantined rows: not a delete, their previous hash carries over until a clean version arrives
+        if len(keys):
+            self._held.append(keys[self.key])
+
+    def wrap(self, batches):
+        # ✅ Passes COPY batches through untouched while diffing them
+        for batch in batches:
+            self.feed_rows(batch)
+            yield batch
+
+    def finish(self):
+        if not self._scopes:
+            logger.warning(f"⚠️ Empty snapshot for {self.spec.name}; no changes recorded.")
+            return dict(self.counts)
+
+        with track_stage("change_capture") as stage:
+            index = pd.concat(self._index, ignore_index=True) if self._index else pd.DataFrame(columns=self.key + ["row_hash"])
+            index = index.drop_duplicates(self.key, keep="last")
+
+            # ✅ Keys of the previous snapshot (same scope) missing from this one were removed
+            removed = self._previous[~self._previous.index.isin(_key_index(index, self.key))]
+            if self._held and len(removed):
+                held = removed.index.isin(_key_index(pd.concat(self._held, ignore_index=True), self.key))
+                kept = removed[held]
+                index = pd.concat([index, kept.index.to_frame(index=False).assign(row_hash=kept.to_numpy())], ignore_index=True)
+                removed = removed[~held]
+            if len(removed):
+                deletes = removed.index.to_frame(index=False).assign(row_hash=removed.to_numpy(), change_type=DELETE)
+                self._changes.append(deletes)
+                self.counts[DELETE] = len(deletes)
+
+            changes = pd.concat(self._changes, ignore_index=True) if self._changes else pd.DataFrame()
+            changes = changes.reindex(columns=change_columns(self.spec))
+            self.store.write(self.spec, changes, index, sorted(self._scopes, key=str), self.run_id)
+            stage.rows = len(changes)
+
+        logger.success(
+            f"🔁 Changes for {self.spec.name} (run {self.run_id}): {self.counts[INSERT]} inserted, "
+            f"{self.counts[UPDATE]} updated, {self.counts[DELETE]} deleted; {len(index)} rows in the snapshot"
+        )
+        return dict(self.counts)
+
+def _scope_name(spec, scope):
+    if not spec.document_key:
+        return "all"
+    return "/".join(f"{column}={quote(str(value), safe='')}" for column, value in zip(spec.document_key, scope))
+
+class ParquetChangeStore:
+    """Hash index (one file per document scope) and change files under a local or s3:// prefix."""
+
+    def __init__(self, config, uri):
+        self.config = config
+        self.uri = uri.rstrip("/")
+
+    def _index_path(self, spec, scope):
+        return f"{self.uri}/{spec.name}_hash_index/{_scope_name(spec, scope)}/index.parquet"
+
+    def previous_index(self, spec, scopes):
+        frames = []
+        for scope in scopes:
+            filesystem, path = _filesystem(self.config, self._index_path(spec, scope))
+            if filesystem.get_file_info(path).type == fs.FileType.File:
+                frames.append(pq.read_table(path, filesystem=filesystem).to_pandas())
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=spec.key + ["row_hash"])
+
+    def write(self, spec, changes, index, scopes, run_id):
+        # ✅ Changes first: if the index write fails, the next run re-emits them rather than losing them
+        if len(changes):
+            schema = pa.schema(
+                [("change_type", pa.string())]
+                + [(column, pa.type_for_alias(arrow_type)) for column, arrow_type in spec.arrow_types().items()]
+                + [("row_hash", pa.int64())]
+            )
+            table = pa.Table.from_pandas(changes, schema=schema, preserve_index=False)
+            table = table.append_column("run_id", pa.array([run_id] * len(changes), pa.string()))
+            filesystem, path = _filesystem(self.config, f"{self.uri}/{spec.name}_changes/run_id={run_id}/{uuid.uuid4().hex[:8]}.parquet")
+            filesystem.create_dir(path.rsplit("/", 1)[0])
+            pq.write_table(table, path, filesystem=filesystem, compression="zstd")
+            logger.info(f"🔁 Wrote {len(changes)} change(s) to {path}")
+
+        scope_cols = spec.document_key
+        for scope in scopes:
+            part = index
+            for column, value in zip(scope_cols, scope):
+                part = part[part[column].isna() if value is None else part[column] == value]
+            filesystem, path = _filesystem(self.config, self._index_path(spec, scope))
+            filesystem.create_dir(path.rsplit("/", 1)[0])
+            hashes = pa.schema([(column, pa.type_for_alias(spec.arrow_types()[column])) for column in spec.key] + [("row_hash", pa.int64())])
+            pq.write_table(pa.Table.from_pandas(part, schema=hashes, preserve_index=False), path, filesystem=filesystem)
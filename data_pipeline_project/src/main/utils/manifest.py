@@ -0,0 +1,105 @@
+import os
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime
+
+from loguru import logger
+
+from src.main.s3.transfer import path_sha256
+from src.main.utils.settings import project_path
+
+CREATE_MANIFEST_SQL = """
+CREATE TABLE IF NOT EXISTS file_manifest (
+    content_hash TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime REAL NOT NULL,
+    source_path TEXT,
+    s3_key TEXT,
+    uploaded_at TEXT,
+    loaded_at TEXT
+);
+"""
+CREATE_STAT_INDEX_SQL = "CREATE INDEX IF NOT EXISTS file_manifest_stat_idx ON file_manifest (source_path, size, mtime);"
+
+class IngestionManifest:
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute(CREATE_MANIFEST_SQL)
+            conn.execute(CREATE_STAT_INDEX_SQL)
+
+    @contextmanager
+    def _connect(self):
+        # ✅ Short-lived connections: safe to use from pool workers
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def fingerprint(self, source_path):
+        source_path = os.path.abspath(source_path)
+        stat = os.stat(source_path)
+
+        # ✅ Same path, size and mtime as a known entry: reuse its hash instead of re-reading the file
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content_hash FROM file_manifest WHERE source_path = ? AND size = ? AND mtime = ?",
+                (source_path, stat.st_size, stat.st_mtime),
+            ).fetchone()
+
+        content_hash = row["content_hash"] if row else path_sha256(source_path)
+        return {"content_hash": content_hash, "size": stat.st_size, "mtime": stat.st_mtime, "source_path": source_path}
+
+    def find(self, content_hash):
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM file_manifest WHERE content_hash = ?", (content_hash,)).fetchone()
+        return dict(row) if row else None
+
+    def is_loaded(self, content_hash):
+        entry = self.find(content_hash)
+        return bool(entry and entry["loaded_at"])
+
+    def s3_key_for(self, content_hash):
+        entry = self.find(content_hash)
+        return entry["s3_key"] if entry else None
+
+    def record_upload(self, fingerprint, s3_key):
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO file_manifest (content_hash, size, mtime, source_path, s3_key, uploaded_at)
+                VALUES (:content_hash, :size, :mtime, :source_path, :s3_key, :uploaded_at)
+                ON CONFLICT (content_hash) DO UPDATE SET
+                    size = excluded.size,
+                    mtime = excluded.mtime,
+                    source_path = excluded.source_path,
+                    s3_key = excluded.s3_key,
+                    uploaded_at = excluded.uploaded_at
+                """,
+                {**fingerprint, "s3_key": s3_key, "uploaded_at": datetime.now().isoformat()},
+            )
+        logger.info(f"🗂️ Manifest: {fingerprint['content_hash'][:12]} -> {s3_key}")
+
+    def mark_loaded(self, fingerprint):
+        # ✅ Upsert: with a local load the upload task may not have inserted the row yet
+        with self._connect() as conn:
+            conn.execute(
+                """
+                INSERT INTO file_manifest (content_hash, size, mtime, source_path, loaded_at)
+                VALUES (:content_hash, :size, :mtime, :source_path, :loaded_at)
+                ON CONFLICT (content_hash) DO UPDATE SET loaded_at = excluded.loaded_at
+                """,
+                {**fingerprint, "loaded_at": datetime.now().isoformat()},
+            )
+        content_hash = fingerprint["content_hash"]
+        logger.info(f"🗂️ Manifest: {content_hash[:12]} marked as loaded")
+
+def get_manifest(config):
+    if not config.getboolean("manifest", "enabled", fallback=False):
+        return None
+    # ✅ One manifest for the scheduler, workers and CLI, whatever directory each one starts in
+    return IngestionManifest(project_path(config.get("manifest", "path", fallback="resources/ingestion_manifest.sqlite")))
@@ -0,0 +1,491 @@
+import json
+import os
+import re
+from functools import lru_cache
+from itertools import repeat
+
+import pandas as pd
+
+from src.main.utils.settings import IDENTIFIER_PATTERN, settings_from_config
+
+# Spec format (dict or JSON file):
+#   "record_path": dotted path to the rows; "{name}" iterates a map/array and captures the key/index
+#   "columns": [{"name", "from", "rule", "type", "nullable", "allowed", "pattern"}, ...]
+#       from: "$.field" (document root), "{name}" (captured key), "field.sub" (inside the record)
+#             or "@" (the record itself, e.g. one string of a skills list)
+#       rule: value | join | join_items | join_fields | count | json   (default: value)
+#       sources: [{"from", "rule", ...}, ...] instead of "from": first source present wins
+#   "table", "key": target table and business key used by the table manager
+#   "indexes": column lists indexed after the bulk load
+#   "children": specs for normalised child tables; their "key" is the parent key they hang off
+#   Validation (src/main/utils/validation.py): key and "nullable": false columns are required,
+#   "allowed" is a value set, "pattern" a full-match regex; rows failing them are quarantined
+
+EMPLOYEE_MAPPING = {
+    "name": "employee",
+    "table": "employee_details",
+    "key": ["company", "department", "employee_id"],
+    "record_path": "departments.{department}.employees.{employee_id}",
+    "columns": [
+        {"name": "company", "from": "$.company"},
+        {"name": "location", "from": "$.location"},
+        {"name": "department", "from": "{department}", "nullable": False},
+        {"name": "employee_id", "from": "{employee_id}", "nullable": False},
+        {"name": "name", "from": "name"},
+        {"name": "role", "from": "role"},
+        {"name": "skills", "from": "skills", "rule": "join", "default": ""},
+        {
+            "name": "campaigns",
+            "sources": [
+                {"from": "projects", "rule": "join_fields", "fields": ["name", "status"]},
+                {"from": "campaigns", "rule": "join_items"},
+            ],
+            "default": "",
+        },
+    ],
+    "indexes": [["department"], ["role"]],
+    "children": [
+        {
+            "name": "employee_skill",
+            "table": "employee_skills",
+            "key": ["company", "department", "employee_id"],
+            "record_path": "departments.{department}.employees.{employee_id}.skills.*",
+            "columns": [
+                {"name": "company", "from": "$.company"},
+                {"name": "department", "from": "{department}", "nullable": False},
+                {"name": "employee_id", "from": "{employee_id}", "nullable": False},
+                {"name": "skill", "from": "@"},
+            ],
+            "indexes": [["skill"], ["company", "department", "employee_id"]],
+        },
+        {
+            "name": "employee_project",
+            "table": "employee_projects",
+            "key": ["company", "department", "employee_id"],
+            "record_path": "departments.{department}.employees.{employee_id}.projects.{position}",
+            "columns": [
+                {"name": "company", "from": "$.company"},
+                {"name": "department", "from": "{department}", "nullable": False},
+                {"name": "employee_id", "from": "{employee_id}", "nullable": False},
+                {"name": "position", "from": "{position}", "type": "INTEGER", "nullable": False},
+                {"name": "project_name", "from": "name"},
+                {"name": "status", "from": "status", "allowed": ["Completed", "Ongoing", "Planned"]},
+            ],
+            "indexes": [["status"], ["project_name"], ["company", "department", "employee_id"]],
+        },
+        {
+            "name": "employee_campaign",
+            "table": "employee_campaigns",
+            "key": ["company", "department", "employee_id"],
+            "record_path": "departments.{department}.employees.{employee_id}.campaigns.{quarter}",
+            "columns": [
+                {"name": "company", "from": "$.company"},
+                {"name": "department", "from": "{department}", "nullable": False},
+                {"name": "employee_id", "from": "{employee_id}", "nullable": False},
+                {"name": "quarter", "from": "{quarter}", "nullable": False},
+                {"name": "campaign", "from": "@"},
+            ],
+            "indexes": [["campaign"], ["company", "department", "employee_id"]],
+        },
+    ],
+}
+
+# ✅ SQL type -> (Python cast, Arrow type name); casts run once per column, not per field access
+SQL_TYPES = {
+    "TEXT": (None, "string"),
+    "INTEGER": (int, "int32"),
+    "BIGINT": (int, "int64"),
+    "DOUBLE PRECISION": (float, "float64"),
+    "NUMERIC": (float, "float64"),
+    "BOOLEAN": (bool, "bool"),
+    "DATE": (None, "string"),
+    "TIMESTAMPTZ": (None, "string"),
+    "JSONB": (lambda value: value if isinstance(value, str) else json.dumps(value), "string"),
+}
+
+RULES = ("value", "join", "join_items", "join_fields", "count", "json")
+
+class Invalid:
+    """Left in a column when a value cannot be extracted or cast; validation quarantines the row."""
+    __slots__ = ("reason",)
+
+    def __init__(self, reason):
+        self.reason = reason
+
+    def __repr__(self):
+        return f"<invalid: {self.reason}>"
+
+# ✅ A rule over a malformed record (a project without "name", skills that are not a list)
+# yields MALFORMED instead of raising and killing the whole load
+MALFORMED = Invalid("malformed")
+BAD_TYPE = Invalid("bad_type")
+RULE_ERRORS = (KeyError, IndexError, TypeError, AttributeError, ValueError)
+
+def _getter(path):
+    keys = path.split(".")
+    if len(keys) == 1:
+        key = keys[0]
+        return lambda record: record.get(key) if isinstance(record, dict) else None
+
+    def get(record):
+        for key in keys:
+            if not isinstance(record, dict):
+                return None
+            record = record.get(key)
+        return record
+    return get
+
+def _rule(source):
+    # ✅ Rules are plain closures over one value; spec strings are data, never code
+    rule = source.get("rule", "value")
+    separator = source.get("separator", ", ")
+
+    if rule == "value":
+        return None
+    if rule == "join":
+        # A bare string would otherwise be joined character by character
+        return lambda value: separator.join(value) if isinstance(value, list) else MALFORMED
+    if rule == "join_items":
+        return lambda value: separator.join([f"{key}: {item}" for key, item in value.items()])
+    if rule == "join_fields":
+        fields = list(source["fields"])
+        if len(fields) == 2:
+            first, second = fields
+            return lambda value: separator.join([f"{item[first]}: {item[second]}" for item in value])
+        return lambda value: separator.join([": ".join([f"{item[field]}" for field in fields]) for item in value])
+    if rule == "count":
+        return len
+    if rule == "json":
+        return json.dumps
+    raise ValueError(f"❌ Unknown mapping rule '{rule}'. Expected one of {RULES}")
+
+def _convert_one(value, rule):
+    try:
+        return rule(value)
+    except RULE_ERRORS:
+        return MALFORMED
+
+def _value_rule(source):
+    rule = _rule(source)
+    if rule is None:
+        return None
+    return lambda value: _convert_one(value, rule)
+
+def _column_rule(source):
+    # ✅ The same rule over a whole column: one comprehension, no Python call per value
+    rule = _rule(source)
+    if rule is None:
+        return None
+    name = source.get("rule", "value")
+    separator = source.get("separator", ", ")
+    fields = source.get("fields", [])
+
+    if name == "join":
+        def fast(values):
+            return [
+                None if value is None else separator.join(value) if isinstance(value, list) else MALFORMED
+                for value in values
+            ]
+    elif name == "join_fields" and len(fields) == 2:
+        first, second = fields
+
+        def fast(values):
+            return [
+                None if value is None else separator.join([f"{item[first]}: {item[second]}" for item in value])
+                for value in values
+            ]
+    elif name == "join_items":
+        def fast(values):
+            return [
+                None if value is None else separator.join([f"{key}: {item}" for key, item in value.items()])
+                for value in values
+            ]
+    else:
+        def fast(values):
+            return [None if value is None else rule(value) for value in values]
+
+    def convert(values):
+        try:
+            return fast(values)
+        except RULE_ERRORS:
+            # Slow path only for a batch that holds a malformed value
+            return [None if value is None else _convert_one(value, rule) for value in values]
+    return convert
+
+def _lookup(path):
+    # records -> one raw value per record
+    if path == "@":
+        return list
+    if "." in path:
+        get = _getter(path)
+        return lambda records: [get(record) if isinstance(record, dict) else MALFORMED for record in records]
+
+    def lookup(records):
+        try:
+            return [record.get(path) for record in records]
+        except AttributeError:
+            # ✅ A record that is not an object (a string or null employee) is quarantined, not loaded as all-NULL
+            return [record.get(path) if isinstance(record, dict) else MALFORMED for record in records]
+    return lookup
+
+def _record_column(sources, default):
+    # ✅ One list comprehension per source over all records: no per-record Python function calls
+    sources = [(_lookup(source["from"]), _column_rule(source)) for source in sources]
+
+    def column(records):
+        values = None
+        for lookup, convert in sources:
+            current = lookup(records)
+            if convert is not None:
+                current = convert(current)
+            # First source present wins
+            values = current if values is None else [value if value is not None else other for value, other in zip(values, current)]
+        if default is not None:
+            values = [default if value is None else value for value in values]
+        return values
+    return column
+
+def _cast_values(values, cast):
+    try:
+        # Sentinels pass through uncast: bool(MALFORMED) would silently become True
+        return [value if value is None or value.__class__ is Invalid else cast(value) for value in values]
+    except RULE_ERRORS:
+        # Slow path only for a batch that holds a bad value: mark it, keep the rest
+        return [_cast_one(value, cast) for value in values]
+
+def _cast_one(value, cast):
+    if value is None or isinstance(value, Invalid):
+        return value
+    try:
+        return cast(value)
+    except RULE_ERRORS:
+        return BAD_TYPE
+
+class MappingSpec:
+    """A declarative document -> table mapping, compiled once into a columnar extractor."""
+
+    def __init__(self, spec):
+        self.spec = spec
+        self.name = spec.get("name", "custom")
+        self.table = spec["table"]
+        self.key = list(spec.get("key", []))
+        self.columns = [column["name"] for column in spec["columns"]]
+        self.types = {column["name"]: column.get("type", "TEXT").upper() for column in spec["columns"]}
+
+        # ✅ Names end up verbatim in CREATE/COPY/MERGE statements: reject anything that is not a plain identifier
+        bad_names = [name for name in [self.name, self.table] + self.columns if not re.fullmatch(IDENTIFIER_PATTERN, str(name))]
+        if bad_names:
+            raise ValueError(f"❌ Invalid SQL identifier(s) {bad_names} in mapping '{self.name}'. Expected {IDENTIFIER_PATTERN}")
+
+        for column, sql_type in self.types.items():
+            if sql_type not in SQL_TYPES:
+                raise ValueError(f"❌ Unsupported type '{sql_type}' for column '{column}'. Expected one of {list(SQL_TYPES)}")
+        missing_keys = [column for column in self.key if column not in self.columns]
+        if missing_keys:
+            raise ValueError(f"❌ Key columns {missing_keys} are not defined in mapping '{self.name}'")
+
+        self.indexes = [list(columns) for columns in spec.get("indexes", [])]
+        self.children = [MappingSpec(child) for child in spec.get("children", [])]
+        unknown = [column for columns in self.indexes for column in columns if column not in self.columns]
+        if unknown:
+            raise ValueError(f"❌ Index columns {unknown} are not defined in mapping '{self.name}'")
+
+        self._steps = self._compile_path(spec["record_path"])
+        self._captures = [name for kind, name in self._steps if kind == "each" and name]
+        self._extractors = [self._compile_column(column) for column in spec["columns"]]
+        self._record_loop = self._compile_record_loop()
+        # Key columns taken from the document root (e.g. company): one document is a full snapshot of them
+        self.document_key = [
+            column for column, extractor in zip(self.columns, self._extractors) if extractor[0] == "root" and column in self.key
+        ]
+
+        # Row checks for the validation stage
+        self.required = [
+            column["name"] for column in spec["columns"] if column["name"] in self.key or column.get("nullable", True) is False
+        ]
+        self.allowed = {column["name"]: list(column["allowed"]) for column in spec["columns"] if "allowed" in column}
+        self.patterns = {column["name"]: column["pattern"] for column in spec["columns"] if "pattern" in column}
+
+    @staticmethod
+    def _compile_path(record_path):
+        steps = []
+        for segment in record_path.split("."):
+            if segment == "*":
+                steps.append(("each", None))
+            elif segment.startswith("{") and segment.endswith("}"):
+                steps.append(("each", segment[1:-1]))
+            else:
+                steps.append(("key", segment))
+        return steps
+
+    def _compile_column(self, column):
+        sources = column.get("sources") or [column]
+        default = column.get("default")
+        cast = SQL_TYPES[self.types[column["name"]]][0]
+
+        origin = sources[0]["from"]
+        if len(sources) == 1 and origin.startswith("$."):
+            return ("root", _getter(origin[2:]), _value_rule(sources[0]), default, cast)
+        if len(sources) == 1 and origin.startswith("{"):
+            capture = origin[1:-1]
+            if capture not in self._captures:
+                raise ValueError(f"❌ Column '{column['name']}' uses '{origin}', which record_path does not capture")
+            return ("capture", capture, None, default, cast)
+        return ("record", _record_column(sources, default), None, default, cast)
+
+    def _compile_record_loop(self):
+        # ✅ Column by column over the same record list, one comprehension each
+        columns = [target for kind, target, _, _, _ in self._extractors if kind == "record"]
+
+        def record_loop(records):
+            records = records if isinstance(records, list) else list(records)
+            return [column(records) for column in columns]
+        return record_loop
+
+    def _walk(self, data):
+        nodes = [data]
+        captured = {name: [] for name in self._captures}
+        active = []
+
+        for kind, name in self._steps:
+            if kind == "key":
+                nodes = [node.get(name) if isinstance(node, dict) else None for node in nodes]
+                continue
+
+            # ✅ Expand level by level: captured values are repeated with extend(), no per-row dicts
+            next_nodes = []
+            next_captured = {capture: [] for capture in active}
+            keys = []
+            for index, node in enumerate(nodes):
+                if isinstance(node, dict):
+                    items_keys, items = node.keys(), node.values()
+                elif isinstance(node, list):
+                    items_keys, items = range(len(node)), node
+                else:
+                    continue
+                count = len(items)
+                next_nodes.extend(items)
+                if name:
+                    keys.extend(items_keys)
+                for capture in active:
+                    next_captured[capture].extend(repeat(captured[capture][index], count))
+
+            nodes = next_nodes
+            for capture in active:
+                captured[capture] = next_captured[capture]
+            if name:
+                captured[name] = keys
+                active.append(name)
+
+        if self._steps[-1][0] == "key":
+            # A path ending in a plain key yields one record per parent; drop parents without it
+            keep = [index for index, node in enumerate(nodes) if node is not None]
+            nodes = [nodes[index] for index in keep]
+            captured = {name: [values[index] for index in keep] for name, values in captured.items()}
+        return nodes, captured
+
+    def _assemble(self, data, captured, record_columns, total):
+        output = {}
+        record_columns = iter(record_columns)
+        for column, (kind, target, convert, default, cast) in zip(self.columns, self._extractors):
+            if kind == "root":
+                value = target(data)
+                if value is not None and convert is not None:
+                    value = convert(value)
+                values = [value if value is not None else default] * total
+            elif kind == "capture":
+                values = captured[target]
+            else:
+                values = next(record_columns)
+
+            if cast is not None:
+                values = _cast_values(values, cast)
+            output[column] = values
+        return output
+
+    def extract(self, data):
+        """Return {column: list of values} for one parsed document."""
+        records, captured = self._walk(data)
+        return self._assemble(data, captured, self._record_loop(records), len(records))
+
+    def document_scope(self, data):
+        """Values of the document key columns (e.g. company) taken from the document root."""
+        scope = []
+        for column in self.document_key:
+            _, target, convert, default, cast = self._extractors[self.columns.index(column)]
+            value = target(data)
+            if value is not None and convert is not None:
+                value = convert(value)
+            value = default if value is None else value
+            scope.append(_cast_one(value, cast) if cast is not None else value)
+        return tuple(scope)
+
+    def row(self, data, captures, record):
+        """Flatten a single record; used by the streaming parser, which never holds the document."""
+        captured = {name: [value] for name, value in captures.items()}
+        output = self._assemble(data, captured, self._record_loop([record]), 1)
+        return {column: values[0] for column, values in output.items()}
+
+    def to_dataframe(self, data):
+        output = self.extract(data)
+        for column, sql_type in self.types.items():
+            if SQL_TYPES[sql_type][0] is not None:
+                # object dtype: ints/bools keep their type and None instead of being widened to float/NaN
+                output[column] = pd.Series(output[column], dtype=object)
+        frame = pd.DataFrame(output, columns=self.columns)
+        # Kept with the rows: an empty snapshot still names the companies it covers
+        frame.attrs["document_scope"] = self.document_scope(data)
+        return frame
+
+    def column_definitions(self):
+        definitions = []
+        for column in self.spec["columns"]:
+            definition = f"{column['name']} {self.types[column['name']]}"
+            if column.get("nullable", True) is False:
+                definition += " NOT NULL"
+            definitions.append(definition)
+        return definitions
+
+    def create_table_sql(self, schema, table=None, unlogged=False, if_not_exists=False, extra_columns=()):
+        # ✅ DDL generated from the same spec as the extractor, so they cannot drift apart
+        table = table or self.table
+        column_defs = ",\n    ".join(self.column_definitions() + list(extra_columns))
+        return (
+            f"CREATE {'UNLOGGED ' if unlogged else ''}TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{schema}.{table} (\n"
+            f"    {column_defs}\n"
+            f");"
+        )
+
+    def index_name(self, columns, table=None):
+        return f"{table or self.table}_{'_'.join(columns)}_idx"
+
+    def create_index_sql(self, schema, table=None):
+        table = table or self.table
+        return [
+            f"CREATE INDEX IF NOT EXISTS {self.index_name(columns, table)} ON {schema}.{table} ({', '.join(columns)});"
+            for columns in self.indexes
+        ]
+
+    def arrow_types(self):
+        return {column: SQL_TYPES[self.types[column]][1] for column in self.columns}
+
+EMPLOYEE_SPEC = MappingSpec(EMPLOYEE_MAPPING)
+
+@lru_cache(maxsize=None)
+def load_spec(path):
+    # ✅ Compiled once per process and path
+    with open(path) as f:
+        return MappingSpec(json.load(f))
+
+def get_spec(config):
+    path = config.get("mapping", "spec_path", fallback="")
+    if not path:
+        return EMPLOYEE_SPEC
+    return load_spec(os.path.abspath(path))
+
+def normalize_enabled(config):
+    return settings_from_config(config).load.normalize
+
+def child_specs(config):
+    # ✅ Normalised child tables (skills, projects, campaigns) are opt-in
+    return get_spec(config).children if normalize_enabled(config) else []
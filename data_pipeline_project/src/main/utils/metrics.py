@@ -0,0 +1,134 @@
+import json
+import os
+import resource
+import socket
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+from loguru import logger
+
+# ✅ Process-wide list of finished stages; reset per task with reset_stages()
+_stages = []
+
+def _peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+class Stage:
+    def __init__(self, name, trace_memory=False):
+        self.name = name
+        self.trace_memory = trace_memory
+        self.bytes = None
+        self.rows = None
+        self.duration_s = None
+        self.peak_mem_mb = None
+
+    def as_dict(self):
+        rows_per_sec = self.rows / self.duration_s if self.rows and self.duration_s else None
+        mb_per_sec = self.bytes / 1024 / 1024 / self.duration_s if self.bytes and self.duration_s else None
+        return {
+            "stage": self.name,
+            "duration_s": round(self.duration_s, 4),
+            "bytes": self.bytes,
+            "rows": self.rows,
+            "rows_per_sec": round(rows_per_sec, 1) if rows_per_sec else None,
+            "mb_per_sec": round(mb_per_sec, 2) if mb_per_sec else None,
+            "peak_mem_mb": round(self.peak_mem_mb, 1) if self.peak_mem_mb is not None else None,
+        }
+
+@contextmanager
+def track_stage(name, trace_memory=None):
+    if trace_memory is None:
+        trace_memory = os.environ.get("PIPELINE_TRACE_MEMORY", "0") == "1"
+
+    stage = Stage(name, trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    elif trace_memory:
+        tracemalloc.reset_peak()
+
+    started = time.perf_counter()
+    try:
+        yield stage
+    finally:
+        stage.duration_s = time.perf_counter() - started
+        if trace_memory:
+            # Python allocations made during this stage only
+            stage.peak_mem_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+            if started_tracing:
+                tracemalloc.stop()
+        else:
+            # Cheap default: process high-water mark
+            stage.peak_mem_mb = _peak_rss_mb()
+
+        _stages.append(stage)
+        logger.info(f"⏱️ {json.dumps(stage.as_dict())}")
+
+def collected_stages():
+    return [stage.as_dict() for stage in _stages]
+
+def reset_stages():
+    _stages.clear()
+
+def write_prometheus_textfile(path, job="json_ingestion", stages=None):
+    stages = collected_stages() if stages is None else stages
+    metrics = {
+        "duration_seconds": "duration_s",
+        "bytes": "bytes",
+        "rows": "rows",
+        "rows_per_second": "rows_per_sec",
+        "peak_memory_megabytes": "peak_mem_mb",
+    }
+
+    lines = []
+    for metric, field in metrics.items():
+        lines.append(f"# TYPE pipeline_stage_{metric} gauge")
+        for stage in stages:
+            if stage[field] is not None:
+                lines.append(f'pipeline_stage_{metric}{{job="{job}",stage="{stage["stage"]}"}} {stage[field]}')
+
+    # ✅ Write then rename, so node_exporter never reads a half-written file
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+    os.replace(tmp_path, path)
+    logger.info(f"📈 Prometheus metrics written to {path}")
+
+def send_statsd(host, port, prefix="json_ingestion", stages=None):
+    stages = collected_stages() if stages is None else stages
+    packets = []
+    for stage in stages:
+        name = f"{prefix}.{stage['stage']}"
+        packets.append(f"{name}.duration:{stage['duration_s'] * 1000:.1f}|ms")
+        for field in ("bytes", "rows", "rows_per_sec", "peak_mem_mb"):
+            if stage[field] is not None:
+                packets.append(f"{name}.{field}:{stage[field]}|g")
+
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        for packet in packets:
+            sock.sendto(packet.encode(), (host, port))
+    logger.info(f"📈 Sent {len(packets)} StatsD metrics to {host}:{port}")
+
+def export_metrics(config, ti=None, job="json_ingestion"):
+    stages = collected_stages()
+    if not stages:
+        return stages
+
+    # {job} in the path gives each task its own .prom file
+    textfile = config.get("metrics", "prometheus_textfile", fallback="")
+    if textfile:
+        write_prometheus_textfile(textfile.format(job=job), job=job, stages=stages)
+
+    statsd_host = config.get("metrics", "statsd_host", fallback="")
+    if statsd_host:
+        send_statsd(statsd_host, config.getint("metrics", "statsd_port", fallback=8125), prefix=job, stages=stages)
+
+    # ✅ XCom keeps the per-run history queryable from Airflow
+    if ti is not None:
+        ti.xcom_push(key="stage_metrics", value=stages)
+
+    return stages
@@ -0,0 +1,165 @@
+import json
+import os
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+from pyarrow import fs
+from loguru import logger
+
+from src.main.s3.transfer import expected_object_checksum
+from src.main.utils.flatten_json import EMPLOYEE_COLUMNS
+from src.main.utils.mapping_spec import EMPLOYEE_SPEC
+from src.main.utils.metrics import track_stage
+from src.main.utils.resources import s3_client_from_config
+from src.main.utils.settings import project_path, settings_from_config
+
+SUCCESS_MARKER = "_SUCCESS"
+# Root values of the staged document (company, location): change capture scopes deletes by them
+ROOTS_FILE = "_ROOTS"
+
+# ✅ Typed schema for the staged rows, from the mapping spec (low-cardinality columns get dictionary pages)
+EMPLOYEE_ARROW_SCHEMA = pa.schema([(col, pa.type_for_alias(arrow_type)) for col, arrow_type in EMPLOYEE_SPEC.arrow_types().items()])
+
+def staging_enabled(config):
+    return config.getboolean("staging", "enabled", fallback=False)
+
+def stage_uri_for(config, s3_key):
+    # ✅ Keyed by the full object key and its content: a new upload to the same key never reuses an old stage
+    # A relative local uri is resolved against the project root, so retries from any directory find the stage
+    base_uri = project_path(config.get("staging", "uri", fallback="data_uploads/staging")).rstrip("/")
+    aws = settings_from_config(config).aws
+    head = s3_client_from_config(config).head_object(Bucket=aws.bucket_name, Key=s3_key)
+    version = expected_object_checksum(head) or head["ETag"].strip('"')
+    return f"{base_uri}/{quote(s3_key, safe='')}/{version}"
+
+def get_partition_cols(config):
+    value = config.get("staging", "partition_by", fallback="")
+    return [col.strip() for col in value.split(",") if col.strip()]
+
+def _filesystem(config, uri):
+    if uri.startswith("s3://"):
+        # ✅ Same credentials and endpoint as the boto3 clients, so stage writes and reads hit one store
+        aws = settings_from_config(config).aws
+        filesystem = fs.S3FileSystem(
+            access_key=aws.aws_access_key_id,
+            secret_key=aws.aws_secret_access_key,
+            region=aws.region_name,
+            endpoint_override=aws.endpoint_url,
+        )
+        return filesystem, uri[len("s3://"):]
+    return fs.LocalFileSystem(), os.path.abspath(uri)
+
+def stage_exists(config, uri):
+    filesystem, path = _filesystem(config, uri)
+    info = filesystem.get_file_info(f"{path}/{SUCCESS_MARKER}")
+    return info.type == fs.FileType.File
+
+def _to_record_batches(row_batches):
+    for batch in row_batches:
+        if batch and isinstance(batch[0], dict):
+            arrays = [pa.array([row.get(field.name) for row in batch], type=field.type) for field in EMPLOYEE_ARROW_SCHEMA]
+        else:
+            arrays = [pa.array(list(col), type=field.type) for col, field in zip(zip(*batch), EMPLOYEE_ARROW_SCHEMA)]
+        yield pa.RecordBatch.from_arrays(arrays, schema=EMPLOYEE_ARROW_SCHEMA)
+
+def write_stage(config, row_batches, uri, roots=None):
+    filesystem, path = _filesystem(config, uri)
+    partition_cols = get_partition_cols(config)
+    compression = config.get("staging", "compression", fallback="zstd")
+    row_group_size = config.getint("staging", "row_group_size", fallback=100000)
+
+    rows = 0
+    def counted(batches):
+        nonlocal rows
+        for batch in batches:
+            rows += batch.num_rows
+            yield batch
+
+    with track_stage("parquet_write") as stage:
+        file_format = ds.ParquetFileFormat()
+        ds.write_dataset(
+            counted(_to_record_batches(row_batches)),
+            path,
+            schema=EMPLOYEE_ARROW_SCHEMA,
+            format=file_format,
+            file_options=file_format.make_write_options(compression=compression),
+            filesystem=filesystem,
+            partitioning=partition_cols or None,
+            partitioning_flavor="hive" if partition_cols else None,
+            min_rows_per_group=min(row_group_size, 10000),
+            max_rows_per_group=row_group_size,
+            existing_data_behavior="delete_matching",
+        )
+        stage.rows = rows
+
+    if roots is not None:
+        # Filled by the parser once the batches above are consumed
+        with filesystem.open_output_stream(f"{path}/{ROOTS_FILE}") as roots_file:
+            roots_file.write(json.dumps(roots).encode())
+
+    # ✅ Marker last: a stage without it is incomplete and gets rebuilt
+    with filesystem.open_output_stream(f"{path}/{SUCCESS_MARKER}") as marker:
+        marker.write(str(rows).encode())
+
+    logger.success(f"🧊 Staged {rows} rows as Parquet at {uri} (partitioned by {partition_cols or 'nothing'})")
+    return rows
+
+def open_stage(config, uri):
+    filesystem, path = _filesystem(config, uri)
+    partition_cols = get_partition_cols(config)
+    # Explicit string types: a department named "2024" must not be inferred as an integer
+    partitioning = ds.partitioning(pa.schema([(col, pa.string()) for col in partition_cols]), flavor="hive") if partition_cols else None
+    return ds.dataset(path, format="parquet", filesystem=filesystem, partitioning=partitioning)
+
+def _filter_expression(filters):
+    expression = None
+    for column, value in (filters or {}).items():
+        condition = ds.field(column) == value
+        expression = condition if expression is None else expression & condition
+    return expression
+
+def iter_stage_batches(config, uri, batch_size=10000, filters=None, skip_rows=0):
+    # ✅ Lazily scans row groups in a fixed order; only the requested columns/partitions are read
+    dataset = open_stage(config, uri)
+    expression = _filter_expression(filters)
+
+    # Row-group metadata counts are exact only when every filter is a partition filter
+    partition_only = set(filters or {}) <= set(get_partition_cols(config))
+    fragments = sorted(dataset.get_fragments(filter=expression), key=lambda fragment: fragment.path)
+
+    for fragment in fragments:
+        for row_group in fragment.split_by_row_group():
+            if skip_rows and partition_only:
+                # ✅ Resume: committed row groups are skipped from metadata, never downloaded
+                num_rows = row_group.row_groups[0].num_rows
+                if skip_rows >= num_rows:
+                    skip_rows -= num_rows
+                    continue
+
+            for record_batch in row_group.to_batches(
+                schema=dataset.schema, columns=EMPLOYEE_COLUMNS, filter=expression, batch_size=batch_size
+            ):
+                if skip_rows:
+                    take = max(record_batch.num_rows - skip_rows, 0)
+                    skip_rows -= record_batch.num_rows - take
+                    record_batch = record_batch.slice(record_batch.num_rows - take)
+                if record_batch.num_rows:
+                    yield list(zip(*(column.to_pylist() for column in record_batch.columns)))
+
+def stage_row_count(config, uri):
+    filesystem, path = _filesystem(config, uri)
+    with filesystem.open_input_stream(f"{path}/{SUCCESS_MARKER}") as marker:
+        return int(marker.read().decode() or 0)
+
+def stage_roots(config, uri):
+    filesystem, path = _filesystem(config, uri)
+    if filesystem.get_file_info(f"{path}/{ROOTS_FILE}").type != fs.FileType.File:
+        return []
+    with filesystem.open_input_stream(f"{path}/{ROOTS_FILE}") as roots_file:
+        return json.loads(roots_file.read().decode())
+
+def stage_partition_values(config, uri, column="department"):
+    # ✅ Reads a single column; cheap even for large stages
+    table = open_stage(config, uri).to_table(columns=[column])
+    return sorted(value for value in table.column(column).unique().to_pylist() if value is not None)
@@ -0,0 +1,84 @@
+import atexit
+import os
+import threading
+
+import boto3
+from loguru import logger
+from sqlalchemy import create_engine
+
+from src.main.utils.settings import settings_from_config
+
+# ✅ Process-level caches: one boto3 session/client per credential set, one pooled engine per DSN
+_lock = threading.RLock()
+_owner_pid = os.getpid()
+_sessions = {}
+_s3_clients = {}
+_engines = {}
+
+def _reset_after_fork():
+    # Pools and sockets must not be shared with a parent process
+    global _owner_pid
+    if os.getpid() == _owner_pid:
+        return
+    for engine in _engines.values():
+        engine.dispose(close=False)
+    _sessions.clear()
+    _s3_clients.clear()
+    _engines.clear()
+    _owner_pid = os.getpid()
+
+def get_boto3_session(aws_access_key_id=None, aws_secret_access_key=None, region_name=None):
+    key = (aws_access_key_id, aws_secret_access_key, region_name)
+    with _lock:
+        _reset_after_fork()
+        if key not in _sessions:
+            _sessions[key] = boto3.session.Session(
+                aws_access_key_id=aws_access_key_id,
+                aws_secret_access_key=aws_secret_access_key,
+                region_name=region_name
+            )
+        return _sessions[key]
+
+def get_s3_client(aws_access_key_id=None, aws_secret_access_key=None, region_name=None, endpoint_url=None):
+    key = (aws_access_key_id, aws_secret_access_key, region_name, endpoint_url)
+    with _lock:
+        _reset_after_fork()
+        if key not in _s3_clients:
+            session = get_boto3_session(aws_access_key_id, aws_secret_access_key, region_name)
+            # boto3 clients are thread-safe, so pool workers can share this one
+            _s3_clients[key] = session.client("s3", endpoint_url=endpoint_url)
+            logger.info(f"✅ S3 client created for region '{region_name}'")
+        return _s3_clients[key]
+
+def s3_client_from_config(config):
+    return get_s3_client(**settings_from_config(config).aws.client_kwargs)
+
+def get_engine(connection_string, pool_size=5, max_overflow=5, pool_pre_ping=True, pool_recycle=1800):
+    key = (connection_string, pool_size, max_overflow, pool_pre_ping, pool_recycle)
+    with _lock:
+        _reset_after_fork()
+        if key not in _engines:
+            _engines[key] = create_engine(
+                connection_string,
+                pool_size=pool_size,
+                max_overflow=max_overflow,
+                pool_pre_ping=pool_pre_ping,
+                pool_recycle=pool_recycle,
+            )
+            logger.info(f"✅ Pooled engine created (pool_size={pool_size}, max_overflow={max_overflow})")
+        return _engines[key]
+
+def engine_from_config(config):
+    # ✅ DSN and pool settings precomputed once per config
+    database = settings_from_config(config).database
+    return get_engine(database.dsn, **database.engine_kwargs)
+
+def dispose_all():
+    with _lock:
+        for engine in _engines.values():
+            engine.dispose()
+        _engines.clear()
+        _s3_clients.clear()
+        _sessions.clear()
+
+atexit.register(dispose_all)
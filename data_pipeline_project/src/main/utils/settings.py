@@ -0,0 +1,344 @@
+import configparser
+import os
+import re
+import threading
+from dataclasses import dataclass, field
+from functools import lru_cache
+from types import MappingProxyType
+from urllib.parse import quote
+
+from loguru import logger
+from sqlalchemy.engine import URL
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "../../.."))
+DEFAULT_CONFIG_PATH = os.path.join(PROJECT_ROOT, "resources", "config.ini")
+
+# PIPELINE__<SECTION>__<KEY>=value overrides any config.ini entry, e.g. PIPELINE__DATABASE__PASSWORD
+ENV_PREFIX = "PIPELINE__"
+
+WRITE_MODES = ("replace", "upsert", "swap")
+DOWNLOAD_MODES = ("stream", "ranged")
+COMPRESSIONS = ("none", "gzip", "zstd")
+EXECUTORS = ("thread", "process")
+BATCH_SOURCES = ("local", "s3")
+QUARANTINES = ("none", "parquet", "postgres")
+
+MB = 1024 * 1024
+
+# Interpolated into SET LOCAL lock_timeout, so only a number with an optional unit is accepted
+LOCK_TIMEOUT_PATTERN = r"\d+\s*(us|ms|s|min|h|d)?"
+# Schema, table and column names are interpolated into DDL/DML, so only plain SQL identifiers are accepted
+IDENTIFIER_PATTERN = r"[A-Za-z_][A-Za-z0-9_]*"
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    user: str = ""
+    password: str = field(default="", repr=False)
+    host: str = ""
+    port: str = ""
+    database: str = ""
+    schema: str = "public"
+    db_type: str = "postgresql"
+    pool_size: int = 5
+    max_overflow: int = 5
+    pool_pre_ping: bool = True
+    pool_recycle: int = 1800
+
+    @property
+    def is_postgres(self):
+        return self.db_type.startswith("postgres")
+
+    @property
+    def dsn(self):
+        # ✅ search_path set through the connection options; URL.create escapes credentials containing @, / or %
+        return URL.create(
+            self.db_type,
+            username=self.user or None,
+            password=self.password or None,
+            host=self.host or None,
+            port=int(self.port) if self.port else None,
+            database=self.database or None,
+            query={"options": f"-csearch_path={self.schema}"} if self.is_postgres else {},
+        )
+
+    @property
+    def asyncpg_dsn(self):
+        user, password = quote(self.user, safe=""), quote(self.password, safe="")
+        return f"postgresql://{user}:{password}@{self.host}:{self.port}/{quote(self.database, safe='')}"
+
+    @property
+    def engine_kwargs(self):
+        return MappingProxyType({
+            "pool_size": self.pool_size,
+            "max_overflow": self.max_overflow,
+            "pool_pre_ping": self.pool_pre_ping,
+            "pool_recycle": self.pool_recycle,
+        })
+
+@dataclass(frozen=True)
+class AwsSettings:
+    aws_access_key_id: str = None
+    aws_secret_access_key: str = field(default=None, repr=False)
+    region_name: str = None
+    endpoint_url: str = None
+    bucket_name: str = ""
+    s3_key_prefix: str = ""
+    existing_s3_key: str = ""
+    multipart_threshold_mb: int = 64
+    multipart_chunksize_mb: int = 16
+    max_concurrency: int = 10
+    download_mode: str = "stream"
+    compression: str = None
+    compression_level: int = None
+
+    @property
+    def client_kwargs(self):
+        # ✅ Exactly the arguments get_s3_client caches on
+        return MappingProxyType({
+            "aws_access_key_id": self.aws_access_key_id,
+            "aws_secret_access_key": self.aws_secret_access_key,
+            "region_name": self.region_name,
+            "endpoint_url": self.endpoint_url,
+        })
+
+    @property
+    def transfer_kwargs(self):
+        return MappingProxyType({
+            "multipart_threshold": self.multipart_threshold_mb * MB,
+            "multipart_chunksize": self.multipart_chunksize_mb * MB,
+            "max_concurrency": self.max_concurrency,
+        })
+
+@dataclass(frozen=True)
+class LoadSettings:
+    write_mode: str = "replace"
+    streaming: bool = False
+    batch_size: int = 10000
+    checkpoint: bool = False
+    normalize: bool = False
+    defer_indexes: bool = False
+    swap_lock_timeout: str = "5s"
+
+@dataclass(frozen=True)
+class BatchSettings:
+    source: str = "local"
+    pattern: str = "*.json"
+    workers: int = 4
+    executor: str = "thread"
+
+@dataclass(frozen=True)
+class ValidationSettings:
+    quarantine: str = "parquet"
+    uri: str = os.path.join(PROJECT_ROOT, "data_uploads", "quarantine")
+    max_invalid_ratio: float = 0.1
+
+@dataclass(frozen=True)
+class Settings:
+    database: DatabaseSettings
+    aws: AwsSettings
+    load: LoadSettings
+    batch: BatchSettings
+    validation: ValidationSettings
+    json_file_path: str = ""
+    # The merged ConfigParser (overrides applied) for sections without a typed view; treat as read-only
+    config: configparser.ConfigParser = field(default=None, repr=False, compare=False)
+
+def _choice(value, choices, name):
+    if value not in choices:
+        raise ValueError(f"❌ Invalid {name}: {value!r} (expected one of {', '.join(choices)})")
+    return value
+
+def _positive(value, name):
+    if value <= 0:
+        raise ValueError(f"❌ {name} must be positive, got {value}")
+    return value
+
+def _ratio(value, name):
+    if not 0 <= value <= 1:
+        raise ValueError(f"❌ {name} must be between 0 and 1, got {value}")
+    return value
+
+def project_path(uri):
+    # Relative local paths are resolved against the project root, not whatever directory the worker started in
+    if "://" in uri:
+        return uri
+    return os.path.join(PROJECT_ROOT, uri)
+
+def _matches(value, pattern, name):
+    if not re.fullmatch(pattern, value):
+        raise ValueError(f"❌ Invalid {name}: {value!r}")
+    return value
+
+def apply_env_overrides(config, environ=None):
+    environ = os.environ if environ is None else environ
+    for name, value in environ.items():
+        if not name.startswith(ENV_PREFIX) or name.count("__") != 2:
+            continue
+        section, key = name[len(ENV_PREFIX):].lower().split("__")
+        if not config.has_section(section):
+            config.add_section(section)
+        config.set(section, key, value)
+        logger.info(f"🔧 [{section}] {key} overridden from ${name}")
+    return config
+
+def _airflow_connection(conn_id):
+    # Imported here: only tasks that name a connection pay for the Airflow hook import
+    from airflow.hooks.base import BaseHook
+    return BaseHook.get_connection(conn_id)
+
+def apply_airflow_connections(config):
+    if not config.has_section("airflow"):
+        return config
+
+    db_conn_id = config.get("airflow", "db_conn_id", fallback="")
+    if db_conn_id:
+        conn = _airflow_connection(db_conn_id)
+        values = {"host": conn.host, "port": conn.port, "user": conn.login, "password": conn.password, "database": conn.schema}
+        if conn.conn_type in ("postgres", "postgresql"):
+            values["db_type"] = "postgresql"
+        if not config.has_section("database"):
+            config.add_section("database")
+        for key, value in values.items():
+            if value not in (None, ""):
+                config.set("database", key, str(value))
+        logger.info(f"🔧 [database] taken from Airflow connection '{db_conn_id}'")
+
+    aws_conn_id = config.get("airflow", "aws_conn_id", fallback="")
+    if aws_conn_id:
+        conn = _airflow_connection(aws_conn_id)
+        extra = conn.extra_dejson
+        values = {
+            "aws_access_key_id": conn.login,
+            "aws_secret_access_key": conn.password,
+            "region_name": extra.get("region_name"),
+            "endpoint_url": extra.get("endpoint_url"),
+        }
+        if not config.has_section("aws"):
+            config.add_section("aws")
+        for key, value in values.items():
+            if value not in (None, ""):
+                config.set("aws", key, str(value))
+        logger.info(f"🔧 [aws] credentials taken from Airflow connection '{aws_conn_id}'")
+    return config
+
+class _Reader:
+    # Empty template values ("key = ") fall back to the default instead of failing int()/bool() parsing
+    def __init__(self, config):
+        self.config = config
+
+    def get(self, section, key, fallback=""):
+        return self.config.get(section, key, fallback="") or fallback
+
+    def getint(self, section, key, fallback):
+        return self.config.getint(section, key) if self.get(section, key) else fallback
+
+    def getbool(self, section, key, fallback):
+        return self.config.getboolean(section, key) if self.get(section, key) else fallback
+
+    def getfloat(self, section, key, fallback):
+        return self.config.getfloat(section, key) if self.get(section, key) else fallback
+
+def build_settings(config):
+    # ✅ Parsed and validated once; every field below is a plain immutable value
+    reader = _Reader(config)
+    get, getint, getbool = reader.get, reader.getint, reader.getbool
+
+    database = DatabaseSettings(
+        user=get("database", "user"),
+        password=get("database", "password"),
+        host=get("database", "host"),
+        port=get("database", "port"),
+        database=get("database", "database"),
+        schema=_matches(get("database", "schema", "public"), IDENTIFIER_PATTERN, "[database] schema"),
+        db_type=get("database", "db_type", "postgresql"),
+        pool_size=_positive(getint("database", "pool_size", 5), "[database] pool_size"),
+        max_overflow=getint("database", "max_overflow", 5),
+        pool_pre_ping=getbool("database", "pool_pre_ping", True),
+        pool_recycle=getint("database", "pool_recycle", 1800),
+    )
+
+    compression = _choice(get("aws", "compression", "none").lower(), COMPRESSIONS, "[aws] compression")
+    aws = AwsSettings(
+        aws_access_key_id=get("aws", "aws_access_key_id") or None,
+        aws_secret_access_key=get("aws", "aws_secret_access_key") or None,
+        region_name=get("aws", "region_name") or None,
+        endpoint_url=get("aws", "endpoint_url") or None,
+        bucket_name=get("aws", "bucket_name"),
+        s3_key_prefix=get("aws", "s3_key_prefix"),
+        existing_s3_key=get("aws", "existing_s3_key"),
+        multipart_threshold_mb=_positive(getint("aws", "multipart_threshold_mb", 64), "[aws] multipart_threshold_mb"),
+        multipart_chunksize_mb=_positive(getint("aws", "multipart_chunksize_mb", 16), "[aws] multipart_chunksize_mb"),
+        max_concurrency=_positive(getint("aws", "max_concurrency", 10), "[aws] max_concurrency"),
+        download_mode=_choice(get("aws", "download_mode", "stream"), DOWNLOAD_MODES, "[aws] download_mode"),
+        compression=None if compression == "none" else compression,
+        compression_level=getint("aws", "compression_level", 0) or None,
+    )
+
+    load = LoadSettings(
+        write_mode=_choice(get("load", "write_mode", "replace"), WRITE_MODES, "[load] write_mode"),
+        streaming=getbool("load", "streaming", False),
+        batch_size=_positive(getint("load", "batch_size", 10000), "[load] batch_size"),
+        checkpoint=getbool("load", "checkpoint", False),
+        normalize=getbool("load", "normalize", False),
+        defer_indexes=getbool("load", "defer_indexes", False),
+        swap_lock_timeout=_matches(get("load", "swap_lock_timeout", "5s"), LOCK_TIMEOUT_PATTERN, "[load] swap_lock_timeout"),
+    )
+
+    batch = BatchSettings(
+        source=_choice(get("batch", "source", "local"), BATCH_SOURCES, "[batch] source"),
+        pattern=get("batch", "pattern", "*.json"),
+        workers=_positive(getint("batch", "workers", 4), "[batch] workers"),
+        executor=_choice(get("batch", "executor", "thread"), EXECUTORS, "[batch] executor"),
+    )
+
+    validation = ValidationSettings(
+        quarantine=_choice(get("validation", "quarantine", "parquet"), QUARANTINES, "[validation] quarantine"),
+        uri=project_path(get("validation", "uri", "data_uploads/quarantine")),
+        max_invalid_ratio=_ratio(reader.getfloat("validation", "max_invalid_ratio", 0.1), "[validation] max_invalid_ratio"),
+    )
+
+    return Settings(
+        database=database,
+        aws=aws,
+        load=load,
+        batch=batch,
+        validation=validation,
+        json_file_path=os.path.abspath(get("local", "json_file_path")) if get("local", "json_file_path") else "",
+        config=config,
+    )
+
+@lru_cache(maxsize=None)
+def get_settings(config_path=DEFAULT_CONFIG_PATH):
+    # ✅ Once per process: every task callable and module shares this object
+    # No interpolation: secrets from env overrides and Airflow connections may contain "%"
+    config = configparser.ConfigParser(interpolation=None)
+    if not config.read(config_path):
+        raise FileNotFoundError(f"❌ Config file not found at: {config_path}")
+    apply_env_overrides(config)
+    apply_airflow_connections(config)
+    settings = build_settings(config)
+    _by_config[id(config)] = (config, settings)
+    logger.info(f"⚙️ Settings loaded from {config_path}")
+    return settings
+
+# ConfigParser objects are unhashable, so derived settings are cached by identity
+_lock = threading.Lock()
+_by_config = {}
+
+def settings_from_config(config):
+    with _lock:
+        cached = _by_config.get(id(config))
+        if cached is None or cached[0] is not config:
+            cached = _by_config[id(config)] = (config, build_settings(config))
+        return cached[1]
+
+@lru_cache(maxsize=None)
+def _settings_from_items(items):
+    config = configparser.ConfigParser(interpolation=None)
+    config.read_dict({section: dict(values) for section, values in items})
+    return settings_from_config(config)
+
+def settings_from_dict(config_dict):
+    # ✅ Pool workers receive a plain dict; the same dict maps to one shared settings object
+    items = tuple((section, tuple(sorted(values.items()))) for section, values in sorted(config_dict.items()))
+    return _settings_from_items(items)
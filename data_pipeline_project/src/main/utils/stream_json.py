@@ -0,0 +1,100 @@
+from itertools import islice
+
+import ijson
+from loguru import logger
+
+from src.main.utils.flatten_json import flatten_employee
+
+SCALAR_EVENTS = ("string", "number", "boolean", "null")
+
+def iter_employee_rows(source, roots=None):
+    """Yield flattened employee rows from a binary file-like JSON source.
+
+    Only one employee object is held in memory at a time when `company` and
+    `location` come before `departments`, as in our exports. Otherwise the
+    employees are held until the document ends, so every row still gets them.
+    When `roots` is a list, the document's root values are appended to it at the end.
+    """
+    company = None
+    location = None
+    root_keys = set()
+    # (department, employee_id, employee) waiting for root keys that come after departments
+    held = None
+
+    # ✅ One entry per open container: [container_type, last_map_key]
+    stack = []
+    builder = None
+    builder_depth = 0
+
+    for event, value in ijson.basic_parse(source, use_float=True):
+        # ✅ Inside an employee object: feed events until it closes
+        if builder is not None:
+            builder.event(event, value)
+            if event in ("start_map", "start_array"):
+                builder_depth += 1
+            elif event in ("end_map", "end_array"):
+                builder_depth -= 1
+                if builder_depth == 0:
+                    if held is None:
+                        yield flatten_employee(company, location, stack[1][1], stack[3][1], builder.value)
+                    else:
+                        held.append((stack[1][1], stack[3][1], builder.value))
+                    builder = None
+            continue
+
+        # root -> departments -> <dept> -> employees -> <employee>
+        at_employee = (
+            len(stack) == 4
+            and all(kind == "map" for kind, _ in stack)
+            and stack[0][1] == "departments"
+            and stack[2][1] == "employees"
+        )
+
+        if event == "map_key":
+            stack[-1][1] = value
+            if len(stack) == 1:
+                root_keys.add(value)
+                if value == "departments" and held is None and not {"company", "location"} <= root_keys:
+                    logger.warning("⚠️ company/location not seen before departments; holding rows until the document ends.")
+                    held = []
+        elif at_employee and event in ("start_map", "start_array"):
+            builder = ijson.ObjectBuilder()
+            builder.event(event, value)
+            builder_depth = 1
+        elif at_employee and event in SCALAR_EVENTS:
+            # ✅ A string or null employee still yields a row: the spec marks it malformed, as the in-memory path does
+            if held is None:
+                yield flatten_employee(company, location, stack[1][1], stack[3][1], value)
+            else:
+                held.append((stack[1][1], stack[3][1], value))
+        elif event == "start_map":
+            stack.append(["map", None])
+        elif event == "start_array":
+            stack.append(["array", None])
+        elif event in ("end_map", "end_array"):
+            stack.pop()
+            if not stack and held:
+                for department, employee_id, employee in held:
+                    yield flatten_employee(company, location, department, employee_id, employee)
+                held = None
+            if not stack and roots is not None:
+                roots.append({"company": company, "location": location})
+        elif event in SCALAR_EVENTS and len(stack) == 1 and stack[0][0] == "map":
+            if stack[0][1] == "company":
+                company = value
+            elif stack[0][1] == "location":
+                location = value
+
+def iter_row_batches(rows, batch_size):
+    rows = iter(rows)
+    batch_no = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        batch_no += 1
+        logger.debug(f"📦 Batch {batch_no}: {len(batch)} rows")
+        yield batch
+
+def iter_employee_batches(source, batch_size=10000, roots=None):
+    return iter_row_batches(iter_employee_rows(source, roots), batch_size)
@@ -0,0 +1,201 @@
+from datetime import datetime, timezone
+from itertools import compress
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from pyarrow import fs
+from loguru import logger
+
+from src.main.utils.mapping_spec import BAD_TYPE, MALFORMED, SQL_TYPES, Invalid
+from src.main.utils.metrics import track_stage
+from src.main.utils.parquet_stage import _filesystem
+
+# Reason codes are "<check>:<column>", several per row joined by ";", e.g. "missing:employee_id;not_allowed:status"
+PARENT_QUARANTINED = "parent_quarantined"
+
+def quarantine_columns(spec):
+    return spec.columns + ["reason", "source"]
+
+def _key_index(df, key):
+    return pd.MultiIndex.from_frame(df[key].astype(object))
+
+def check_frame(df, spec, drop_keys=None):
+    """Returns (bad row mask, reason per row); every check is one pass over a whole column."""
+    rows = len(df)
+    bad = np.zeros(rows, dtype=bool)
+    reasons = np.full(rows, "", dtype=object)
+
+    def flag(mask, code):
+        nonlocal bad
+        if mask.any():
+            bad |= mask
+            reasons[mask] += f";{code}"
+
+    # ✅ Extraction and cast failures arrive as sentinels, never as exceptions
+    invalid = {}
+    for column in spec.columns:
+        values = df[column].to_numpy()
+        if values.dtype != object:
+            invalid[column] = np.zeros(rows, dtype=bool)
+            continue
+        malformed, bad_type = values == MALFORMED, values == BAD_TYPE
+        flag(malformed, f"malformed:{column}")
+        flag(bad_type, f"bad_type:{column}")
+        invalid[column] = malformed | bad_type
+
+    for column in spec.required:
+        flag(df[column].isna().to_numpy(), f"missing:{column}")
+
+    for column, allowed in spec.allowed.items():
+        series = df[column]
+        flag((series.notna() & ~series.isin(allowed)).to_numpy() & ~invalid[column], f"not_allowed:{column}")
+
+    for column, pattern in spec.patterns.items():
+        present = df[column].notna().to_numpy() & ~invalid[column]
+        if present.any():
+            mask = present.copy()
+            mask[present] = ~df[column][present].astype(str).str.fullmatch(pattern).to_numpy(dtype=bool)
+            flag(mask, f"bad_format:{column}")
+
+    if drop_keys is not None and len(drop_keys) and spec.key:
+        # Child rows of a quarantined parent would reference a row that never loads
+        flag(_key_index(df, spec.key).isin(_key_index(drop_keys, spec.key)), PARENT_QUARANTINED)
+
+    return bad, reasons
+
+def _as_text(value):
+    if value is None or isinstance(value, Invalid) or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+def quarantine_frame(rows, spec, source):
+    # All text: a quarantined value may not fit the target column type, and sentinels carry no value
+    frame = pd.DataFrame({column: [_as_text(value) for value in rows[column]] for column in spec.columns})
+    frame["reason"] = rows["reason"].to_numpy()
+    frame["source"] = source
+    return frame[quarantine_columns(spec)]
+
+def keys_frame(frame, spec):
+    # Quarantined keys come back as text; numeric keys are cast so they match the loaded rows
+    frame = frame[spec.key].copy()
+    for column in spec.key:
+        if SQL_TYPES[spec.types[column]][0] in (int, float):
+            frame[column] = pd.to_numeric(frame[column])
+    return frame.drop_duplicates(ignore_index=True)
+
+class RowValidator:
+    """Splits flattened rows into rows to load and rows to quarantine, with a reason code each."""
+
+    def __init__(self, spec, store=None, source=None, max_invalid_ratio=1.0):
+        self.spec = spec
+        self.store = store
+        self.source = source
+        self.max_invalid_ratio = max_invalid_ratio
+        self.rows = 0
+        self.orphans = 0
+        self.counts = {}
+        self._bad = []
+        self._finished = False
+
+    def for_spec(self, spec):
+        # Child tables: same store, source and threshold, their own quarantine table
+        return RowValidator(spec, self.store, self.source, self.max_invalid_ratio)
+
+    def _split(self, df, drop_keys=None):
+        self.rows += len(df)
+        bad, reasons = check_frame(df, self.spec, drop_keys)
+        if bad.any():
+            quarantined = df[bad].assign(reason=pd.Series(reasons[bad], index=df.index[bad]).str[1:])
+            self._bad.append(quarantined)
+            self.orphans += int((quarantined["reason"] == PARENT_QUARANTINED).sum())
+            for code, count in quarantined["reason"].str.split(";").explode().value_counts().items():
+                self.counts[code] = self.counts.get(code, 0) + int(count)
+        return ~bad
+
+    def validate(self, df, drop_keys=None):
+        if df.empty:
+            return df
+        good = self._split(df, drop_keys)
+        return df if good.all() else df[good].reset_index(drop=True)
+
+    def filter_rows(self, rows):
+        if not rows:
+            return rows
+        # ✅ One DataFrame per batch (dict rows from the stream, tuples from the stage); a clean batch passes through as is
+        good = self._split(pd.DataFrame(rows, columns=self.spec.columns))
+        return rows if good.all() else list(compress(rows, good))
+
+    def wrap(self, batches):
+        for batch in batches:
+            batch = self.filter_rows(batch)
+            if batch:
+                yield batch
+        # ✅ Runs before the bulk loader commits its last batch, so the threshold can still stop the load
+        self.finish()
+
+    def quarantined(self):
+        if not self._bad:
+            return pd.DataFrame(columns=self.spec.columns + ["reason"])
+        return pd.concat(self._bad, ignore_index=True)
+
+    def quarantined_keys(self):
+        return self.quarantined()[self.spec.key].drop_duplicates(ignore_index=True)
+
+    def finish(self):
+        if self._finished:
+            return dict(self.counts)
+        self._finished = True
+
+        bad = self.quarantined()
+        with track_stage("quarantine") as stage:
+            if self.store is not None:
+                # Written even when empty: a rerun clears what an earlier attempt quarantined for this source
+                self.store.write(self.spec, quarantine_frame(bad, self.spec, self.source), self.source)
+            stage.rows = len(bad)
+
+        summary = ", ".join(f"{code}={count}" for code, count in sorted(self.counts.items()))
+        if len(bad):
+            where = "quarantined" if self.store is not None else "dropped ([validation] quarantine = none)"
+            logger.warning(f"🚧 {len(bad)} of {self.rows} {self.spec.name} rows {where}: {summary}")
+        else:
+            logger.info(f"✅ All {self.rows} {self.spec.name} rows passed validation")
+
+        # ✅ One decision per load, not one exception per row; orphans were already counted against the parent
+        failed = len(bad) - self.orphans
+        if self.rows and failed / self.rows > self.max_invalid_ratio:
+            raise ValueError(
+                f"❌ {failed} of {self.rows} {self.spec.name} rows failed validation "
+                f"(more than max_invalid_ratio = {self.max_invalid_ratio}): {summary}"
+            )
+        return dict(self.counts)
+
+class ParquetQuarantineStore:
+    """Quarantined rows as one Parquet file per mapping and source under a local or s3:// prefix."""
+
+    def __init__(self, config, uri):
+        self.config = config
+        self.uri = uri.rstrip("/")
+
+    def _path(self, spec, source):
+        return f"{self.uri}/{spec.name}_quarantine/source={quote(str(source), safe='')}/quarantine.parquet"
+
+    def write(self, spec, rows, source):
+        filesystem, path = _filesystem(self.config, self._path(spec, source))
+        if not len(rows):
+            if filesystem.get_file_info(path).type == fs.FileType.File:
+                filesystem.delete_file(path)
+            return
+        schema = pa.schema([(column, pa.string()) for column in quarantine_columns(spec)] + [("quarantined_at", pa.string())])
+        rows = rows.assign(quarantined_at=datetime.now(timezone.utc).isoformat())
+        filesystem.create_dir(path.rsplit("/", 1)[0])
+        pq.write_table(pa.Table.from_pandas(rows, schema=schema, preserve_index=False), path, filesystem=filesystem)
+        logger.info(f"🚧 Wrote {len(rows)} quarantined row(s) to {path}")
+
+    def keys(self, spec, source):
+        filesystem, path = _filesystem(self.config, self._path(spec, source))
+        if filesystem.get_file_info(path).type != fs.FileType.File:
+            return pd.DataFrame(columns=spec.key)
+        return keys_frame(pq.read_table(path, filesystem=filesystem, columns=spec.key).to_pandas(), spec)
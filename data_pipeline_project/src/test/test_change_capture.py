@@ -0,0 +1,76 @@
+import configparser
+import io
+import json
+
+import pyarrow.dataset as ds
+
+from src.main.utils.change_capture import ChangeCapture, ParquetChangeStore
+from src.main.utils.flatten_json import flatten_document
+from src.main.utils.mapping_spec import EMPLOYEE_SPEC
+from src.main.utils.stream_json import iter_employee_rows
+
+def company(name, employees):
+    return {"company": name, "location": "Remote", "departments": {"Engineering": {"employees": employees}}}
+
+def snapshot(store, data):
+    # Same calls as load_frames_to_rds: scope from the document root, then the rows
+    capture = ChangeCapture(EMPLOYEE_SPEC, store)
+    frame = flatten_document(data)
+    capture.add_scopes([frame.attrs["document_scope"]])
+    capture.feed(frame)
+    return capture.finish(), capture.run_id
+
+def streamed_snapshot(store, data):
+    # Same calls as load_stream_to_rds: the root values arrive once the document ends
+    capture = ChangeCapture(EMPLOYEE_SPEC, store)
+    roots = []
+    capture.feed_rows(list(iter_employee_rows(io.BytesIO(json.dumps(data).encode()), roots)))
+    capture.add_scopes(EMPLOYEE_SPEC.document_scope(root) for root in roots)
+    return capture.finish(), capture.run_id
+
+def changes(tmp_path, run_id):
+    path = tmp_path / "employee_changes" / f"run_id={run_id}"
+    if not path.exists():
+        return {}
+    table = ds.dataset(str(path), format="parquet").to_table(columns=["employee_id", "change_type"])
+    return dict(zip(table.column("employee_id").to_pylist(), table.column("change_type").to_pylist()))
+
+def make_store(tmp_path):
+    return ParquetChangeStore(configparser.ConfigParser(), str(tmp_path))
+
+def test_insert_update_delete_and_unchanged_rerun(tmp_path):
+    store = make_store(tmp_path)
+    first = company("Acme", {"E1": {"name": "Ana"}, "E2": {"name": "Bo"}})
+    counts, run_id = snapshot(store, first)
+    assert counts == {"insert": 2, "update": 0, "delete": 0}
+    assert changes(tmp_path, run_id) == {"E1": "insert", "E2": "insert"}
+
+    second = company("Acme", {"E1": {"name": "Ana", "role": "Lead"}, "E3": {"name": "Cy"}})
+    counts, run_id = snapshot(store, second)
+    assert counts == {"insert": 1, "update": 1, "delete": 1}
+    assert changes(tmp_path, run_id) == {"E1": "update", "E2": "delete", "E3": "insert"}
+
+    counts, run_id = snapshot(store, second)
+    assert counts == {"insert": 0, "update": 0, "delete": 0}
+    assert changes(tmp_path, run_id) == {}
+
+def test_company_emptied_to_zero_employees(tmp_path):
+    store = make_store(tmp_path)
+    snapshot(store, company("Acme", {"E1": {"name": "Ana"}, "E2": {"name": "Bo"}}))
+    snapshot(store, company("Globex", {"G1": {"name": "Hank"}}))
+
+    counts, run_id = snapshot(store, company("Acme", {}))
+    assert counts == {"insert": 0, "update": 0, "delete": 2}
+    assert changes(tmp_path, run_id) == {"E1": "delete", "E2": "delete"}
+
+    # Other companies are outside the file's scope and keep their rows
+    counts, _ = snapshot(store, company("Globex", {"G1": {"name": "Hank"}}))
+    assert counts == {"insert": 0, "update": 0, "delete": 0}
+
+def test_streamed_company_emptied_to_zero_employees(tmp_path):
+    store = make_store(tmp_path)
+    streamed_snapshot(store, company("Acme", {"E1": {"name": "Ana"}}))
+
+    counts, run_id = streamed_snapshot(store, {"departments": {}, "company": "Acme"})
+    assert counts == {"insert": 0, "update": 0, "delete": 1}
+    assert changes(tmp_path, run_id) == {"E1": "delete"}
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from src.benchmarks.bench_flatten import flatten_document_reference
+from src.benchmarks.synthetic_data import make_company
+from src.main.utils.flatten_json import flatten_document
+
+# Run from data_pipeline_project: python -m pytest src/test
+
+MISSING_FIELDS = {
+    "company": "Acme",
+    "departments": {
+        "Engineering": {"employees": {
+            "E1": {},
+            "E2": {"name": "Ana", "projects": [{"name": "Apollo", "status": "Ongoing"}]},
+            "E3": {"role": "Analyst", "campaigns": {"Spring": "Done"}},
+        }},
+        "Empty": {},
+    },
+}
+
+EMPTY_LISTS = {
+    "company": "Acme",
+    "location": "Remote",
+    "departments": {"Sales": {"employees": {
+        "S1": {"name": "Bo", "skills": [], "projects": []},
+        "S2": {"name": "Cy", "skills": [], "campaigns": {}},
+    }}},
+}
+
+UNICODE = {
+    "company": "Société Générale",
+    "location": "Zürich",
+    "departments": {"Développement": {"employees": {
+        "ü-1": {"name": "José Núñez", "role": "Ingénieur", "skills": ["Python", "日本語"],
+                "projects": [{"name": "Ωmega", "status": "En cours"}]},
+        "ü-2": {"name": "李雷", "campaigns": {"Été ☀️": "Terminé"}},
+    }}},
+}
+
+@pytest.mark.parametrize("data", [
+    MISSING_FIELDS,
+    EMPTY_LISTS,
+    UNICODE,
+    make_company(3, 50),
+], ids=["missing_fields", "empty_lists", "unicode", "synthetic"])
+def test_columnar_flattener_matches_reference(data):
+    # ✅ Same columns, order and values as the original per-employee loop
+    pd.testing.assert_frame_equal(flatten_document(data), flatten_document_reference(data))
+
+def test_columnar_flattener_without_departments():
+    assert flatten_document({"company": "Acme"}).empty
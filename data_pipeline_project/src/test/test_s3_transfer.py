@@ -0,0 +1,79 @@
+import configparser
+import gzip
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.main.s3.transfer import CHECKSUM_METADATA_KEY, MB, ChecksumReader, DecompressingReader, build_transfer_config
+from src.main.s3.transfer import download_to_tempfile, path_sha256
+from src.main.s3.upload_to_s3 import S3Uploader
+
+BUCKET = "test-bucket"
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    with mock_aws():
+        client = boto3.client("s3", region_name="us-east-1")
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+@pytest.fixture
+def transfer_config():
+    # 5 MB is the smallest part S3 accepts; 12 MB payloads split into three parts
+    config = configparser.ConfigParser()
+    config.read_dict({"aws": {"multipart_threshold_mb": "5", "multipart_chunksize_mb": "5", "max_concurrency": "4"}})
+    return build_transfer_config(config)
+
+@pytest.fixture
+def payload(tmp_path):
+    path = tmp_path / "payload.json"
+    line = b'{"name": "Employee", "role": "Backend Developer", "status": "Ongoing"},\n'
+    path.write_bytes(line * (12 * MB // len(line)))
+    return path
+
+def test_multipart_upload_stores_checksum(s3, transfer_config, payload):
+    S3Uploader(None, None, "us-east-1", BUCKET, transfer_config=transfer_config).upload_file(str(payload), "raw/payload.json")
+
+    head = s3.head_object(Bucket=BUCKET, Key="raw/payload.json")
+    # Multipart ETags end in "-<part count>"
+    assert head["ETag"].strip('"').endswith("-3")
+    assert head["ContentLength"] == payload.stat().st_size
+    assert head["Metadata"][CHECKSUM_METADATA_KEY] == path_sha256(payload)
+
+def test_ranged_download_is_verified(s3, transfer_config, payload):
+    S3Uploader(None, None, "us-east-1", BUCKET, transfer_config=transfer_config).upload_file(str(payload), "raw/payload.json")
+
+    ranges = []
+    s3.meta.events.register("before-parameter-build.s3.GetObject", lambda params, **kwargs: ranges.append(params.get("Range")))
+    with download_to_tempfile(s3, BUCKET, "raw/payload.json", transfer_config) as body:
+        assert body.read() == payload.read_bytes()
+    assert len(ranges) == 3 and all(ranges)
+
+def test_ranged_download_rejects_bad_checksum(s3, transfer_config, payload):
+    s3.put_object(Bucket=BUCKET, Key="raw/bad.json", Body=payload.read_bytes(), Metadata={CHECKSUM_METADATA_KEY: "0" * 64})
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        download_to_tempfile(s3, BUCKET, "raw/bad.json", transfer_config)
+
+def test_streamed_read_rejects_bad_checksum(s3):
+    s3.put_object(Bucket=BUCKET, Key="raw/bad.json", Body=b"[]", Metadata={CHECKSUM_METADATA_KEY: "0" * 64})
+    obj = s3.get_object(Bucket=BUCKET, Key="raw/bad.json")
+    reader = ChecksumReader(obj["Body"], "raw/bad.json", obj["Metadata"][CHECKSUM_METADATA_KEY], obj["ContentLength"])
+    assert reader.read() == b"[]"
+    # Verified at EOF, when the parser asks for more
+    with pytest.raises(ValueError, match="Checksum mismatch"):
+        reader.read()
+
+def test_compressed_upload_round_trip(s3, transfer_config, payload):
+    uploader = S3Uploader(None, None, "us-east-1", BUCKET, transfer_config=transfer_config)
+    uploader.upload_file(str(payload), "raw/payload.json.gz", compression="gzip")
+
+    obj = s3.get_object(Bucket=BUCKET, Key="raw/payload.json.gz")
+    assert obj["ContentEncoding"] == "gzip"
+    body = ChecksumReader(obj["Body"], "raw/payload.json.gz", obj["Metadata"][CHECKSUM_METADATA_KEY], obj["ContentLength"])
+    reader = DecompressingReader(body, "gzip", "raw/payload.json.gz")
+    assert reader.read() == payload.read_bytes()
+    reader.verify()
+    assert gzip.decompress(s3.get_object(Bucket=BUCKET, Key="raw/payload.json.gz")["Body"].read()) == payload.read_bytes()
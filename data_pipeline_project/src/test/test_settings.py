@@ -0,0 +1,22 @@
+import configparser
+from urllib.parse import unquote, urlsplit
+
+from src.main.utils.settings import apply_env_overrides, settings_from_config, settings_from_dict
+
+def test_env_override_with_percent_sign():
+    config = configparser.ConfigParser(interpolation=None)
+    apply_env_overrides(config, {"PIPELINE__DATABASE__PASSWORD": "p%ss"})
+    assert settings_from_config(config).database.password == "p%ss"
+    assert settings_from_dict({"database": {"password": "p%ss"}}).database.password == "p%ss"
+
+def test_dsn_escapes_credentials():
+    database = settings_from_dict({"database": {
+        "user": "etl@corp", "password": "p@ss/w%rd", "host": "db.local", "port": "5432", "database": "employees",
+    }}).database
+
+    assert database.dsn.username == "etl@corp"
+    assert database.dsn.password == "p@ss/w%rd"
+    assert database.dsn.host == "db.local"
+
+    parts = urlsplit(database.asyncpg_dsn)
+    assert (unquote(parts.username), unquote(parts.password), parts.hostname) == ("etl@corp", "p@ss/w%rd", "db.local")
@@ -0,0 +1,60 @@
+import io
+import json
+
+import pandas as pd
+import pytest
+
+from src.benchmarks.synthetic_data import make_company
+from src.main.utils.flatten_json import flatten_document
+from src.main.utils.stream_json import iter_employee_batches, iter_employee_rows
+
+ROOT_FIRST = {
+    "company": "Acme",
+    "location": "Zürich",
+    "departments": {
+        "Engineering": {"employees": {
+            "E1": {"name": "José", "role": "Dev", "skills": ["Python", "日本語"],
+                   "projects": [{"name": "Apollo", "status": "Ongoing"}]},
+            "E2": {"name": "Bo", "skills": [], "campaigns": {"Q1": "Spring"}},
+        }},
+        "Sales": {"employees": {"S1": {}}},
+    },
+}
+
+# Root keys after departments: the stream cannot fill them in until the document ends
+ROOT_LAST = {
+    "departments": ROOT_FIRST["departments"],
+    "location": "Zürich",
+    "company": "Acme",
+}
+
+MALFORMED_EMPLOYEES = {
+    "company": "Acme",
+    "location": "Remote",
+    "departments": {"Engineering": {"employees": {
+        "E1": {"name": "Ana", "skills": ["Go"]},
+        "E2": "not an object",
+        "E3": None,
+        "E4": [1, 2],
+        "E5": {"name": "Cy", "skills": "Go"},
+    }}},
+}
+
+def stream_frame(data):
+    rows = list(iter_employee_rows(io.BytesIO(json.dumps(data).encode())))
+    return pd.DataFrame(rows)
+
+@pytest.mark.parametrize("data", [
+    ROOT_FIRST,
+    ROOT_LAST,
+    MALFORMED_EMPLOYEES,
+    make_company(3, 50),
+], ids=["root_first", "root_last", "malformed_employees", "synthetic"])
+def test_stream_matches_in_memory_flattener(data):
+    # ✅ Same rows, columns and sentinels as flatten_document, whatever the key order
+    pd.testing.assert_frame_equal(stream_frame(data), flatten_document(data))
+
+def test_batches_cover_every_row():
+    data = make_company(2, 25)
+    batches = list(iter_employee_batches(io.BytesIO(json.dumps(data).encode()), batch_size=20))
+    assert [len(batch) for batch in batches] == [20, 20, 10]
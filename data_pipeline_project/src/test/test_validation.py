@@ -0,0 +1,114 @@
+import configparser
+import json
+
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+
+from src.main.db.load_json_to_rds import validate_frames
+from src.main.utils.flatten_json import flatten_document, flatten_json_tables
+from src.main.utils.mapping_spec import EMPLOYEE_SPEC, MALFORMED
+from src.main.utils.validation import PARENT_QUARANTINED, ParquetQuarantineStore, RowValidator, check_frame
+
+DOCUMENT = {
+    "company": "Acme",
+    "location": "Remote",
+    "departments": {"Engineering": {"employees": {
+        "E1": {"name": "Ana", "skills": ["Python"], "projects": [{"name": "Apollo", "status": "Ongoing"}]},
+        # skills must be a list: the parent row is malformed, its project row goes with it
+        "E2": {"name": "Bo", "skills": "Go", "projects": [{"name": "Borealis", "status": "Ongoing"}]},
+        # only the child row is invalid
+        "E3": {"name": "Cy", "skills": [], "projects": [{"name": "Comet", "status": "Cancelled"}]},
+        "E4": None,
+    }}},
+}
+
+def make_config(tmp_path, max_invalid_ratio="1.0"):
+    config = configparser.ConfigParser()
+    config.read_dict({
+        "load": {"normalize": "true"},
+        "validation": {"quarantine": "parquet", "uri": str(tmp_path), "max_invalid_ratio": max_invalid_ratio},
+    })
+    return config
+
+def reasons(validator):
+    bad = validator.quarantined()
+    return dict(zip(bad["employee_id"], bad["reason"]))
+
+def test_missing_and_not_allowed_reason_codes():
+    spec = EMPLOYEE_SPEC.children[1]
+    df = pd.DataFrame({
+        "company": ["Acme", "Acme"],
+        "department": ["Engineering", None],
+        "employee_id": ["E1", "E2"],
+        "position": [0, 0],
+        "project_name": ["Apollo", "Borealis"],
+        "status": ["Ongoing", "Cancelled"],
+    })
+    bad, codes = check_frame(df, spec)
+    assert bad.tolist() == [False, True]
+    assert set(codes[1].strip(";").split(";")) == {"missing:department", "not_allowed:status"}
+
+def test_malformed_rows_are_quarantined():
+    validator = RowValidator(EMPLOYEE_SPEC)
+    valid = validator.validate(flatten_document(DOCUMENT))
+
+    assert valid["employee_id"].tolist() == ["E1", "E3"]
+    found = reasons(validator)
+    assert found["E2"] == "malformed:skills"
+    assert set(found["E4"].split(";")) == {"malformed:name", "malformed:role", "malformed:skills", "malformed:campaigns"}
+
+def test_children_of_quarantined_parent_are_dropped(tmp_path):
+    config = make_config(tmp_path)
+    frames = flatten_json_tables(json.dumps(DOCUMENT).encode(), [EMPLOYEE_SPEC] + EMPLOYEE_SPEC.children)
+    (parents, skills, projects, campaigns), dropped = validate_frames(config, frames, source="doc.json")
+
+    assert sorted(dropped["employee_id"]) == ["E2", "E4"]
+    assert skills["employee_id"].tolist() == ["E1"]
+    # E2's project follows its parent; E3's is invalid on its own
+    assert projects["employee_id"].tolist() == ["E1"]
+
+    store = ParquetQuarantineStore(config, str(tmp_path))
+    quarantined = pq.read_table(store._path(EMPLOYEE_SPEC.children[1], "doc.json")).to_pandas()
+    assert dict(zip(quarantined["employee_id"], quarantined["reason"])) == {
+        "E2": PARENT_QUARANTINED, "E3": "not_allowed:status",
+    }
+
+def test_finish_raises_over_max_invalid_ratio():
+    df = flatten_document(DOCUMENT)
+
+    strict = RowValidator(EMPLOYEE_SPEC, max_invalid_ratio=0.25)
+    strict.validate(df)
+    with pytest.raises(ValueError, match="max_invalid_ratio"):
+        strict.finish()
+
+    lenient = RowValidator(EMPLOYEE_SPEC, max_invalid_ratio=0.5)
+    lenient.validate(df)
+    assert lenient.finish() == {
+        "malformed:skills": 2, "malformed:name": 1, "malformed:role": 1, "malformed:campaigns": 1,
+    }
+
+def test_parquet_store_writes_only_quarantined_rows(tmp_path):
+    store = ParquetQuarantineStore(configparser.ConfigParser(), str(tmp_path))
+    path = tmp_path / "employee_quarantine" / "source=doc.json" / "quarantine.parquet"
+
+    validator = RowValidator(EMPLOYEE_SPEC, store, source="doc.json")
+    validator.validate(flatten_document(DOCUMENT))
+    validator.finish()
+    written = pq.read_table(path).to_pandas()
+    assert sorted(written["employee_id"]) == ["E2", "E4"]
+    # Sentinels are stored as NULL, not as their repr
+    assert written.loc[written["employee_id"] == "E4", "name"].isna().all()
+    assert str(MALFORMED) not in written["skills"].tolist()
+
+    # A clean rerun of the same source clears what the earlier attempt quarantined
+    clean = RowValidator(EMPLOYEE_SPEC, store, source="doc.json")
+    clean.validate(flatten_document({"company": "Acme", "departments": {"Engineering": {"employees": {"E1": {"name": "Ana"}}}}}))
+    clean.finish()
+    assert not path.exists()
+
+def test_parquet_store_skips_empty_quarantine(tmp_path):
+    validator = RowValidator(EMPLOYEE_SPEC, ParquetQuarantineStore(configparser.ConfigParser(), str(tmp_path)), source="clean.json")
+    validator.validate(flatten_document({"company": "Acme", "departments": {"Engineering": {"employees": {"E1": {"name": "Ana"}}}}}))
+    validator.finish()
+    assert not any(tmp_path.rglob("*.parquet"))